@@ -0,0 +1,54 @@
+#!/usr/bin/env python3
+"""
+Micro-benchmark du coût de validation d'une URL Pinterest par message
+Compare le motif unique de pinterest_urls à l'ancienne boucle de dix motifs
+"""
+
+import os
+import re
+import sys
+import timeit
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from pinterest_urls import match_pinterest_url
+
+LEGACY_PATTERNS = [
+    r'https?://(www\.)?pinterest\.(com|fr|de|es|it|co\.uk)/pin/\d+',
+    r'https?://(www\.)?pinterest\.(com|fr|de|es|it|co\.uk)/[^/]+/pin/\d+',
+    r'https?://pin\.it/[a-zA-Z0-9]+',
+    r'https?://pinterest\.com/pin/\d+',
+    r'https?://pinterest\.fr/pin/\d+',
+    r'https?://pinterest\.de/pin/\d+',
+    r'https?://pinterest\.es/pin/\d+',
+    r'https?://pinterest\.it/pin/\d+',
+    r'pinterest://pin/\d+',
+    r'https?://(www\.)?pinterest\.(com|fr|de|es|it|co\.uk)/pin/\d+/',
+]
+
+SAMPLES = [
+    "https://www.pinterest.com/pin/123456789012345678/",
+    "https://pin.it/3xAmPlE",
+    "https://fr.pinterest.com/user/pin/987654321/",
+    "Regarde cette vidéo trop drôle !",
+]
+
+
+def legacy_match(url: str) -> bool:
+    for pattern in LEGACY_PATTERNS:
+        if re.match(pattern, url.strip()):
+            return True
+    return 'pin.it' in url.lower()
+
+
+def main(runs: int = 200000):
+    print("🧪 Validation des URLs Pinterest (coût par message)")
+    for sample in SAMPLES:
+        legacy = timeit.timeit(lambda: legacy_match(sample), number=runs) / runs
+        combined = timeit.timeit(lambda: match_pinterest_url(sample), number=runs) / runs
+        print(f"  {sample[:45]:<45} ancien: {legacy * 1e6:6.2f} µs  "
+              f"nouveau: {combined * 1e6:6.2f} µs  (x{legacy / combined:.1f})")
+
+
+if __name__ == "__main__":
+    main()
@@ -7,12 +7,21 @@ Télécharge des vidéos depuis Pinterest
 import os
 import logging
 import asyncio
+import time
+import aiohttp
 from datetime import datetime
 from telegram import Update, InlineKeyboardButton, InlineKeyboardMarkup
 from telegram.ext import Application, CommandHandler, MessageHandler, CallbackQueryHandler, filters, ContextTypes
+from telegram.error import BadRequest
 from pinterest_downloader import PinterestDownloader
+from pinterest_urls import is_pinterest_url
+from cache import VideoCache
+from concurrency import SingleFlight, AdmissionController, AdmissionRejected, FairScheduler
+from sessions import SessionStore
+from storage import Storage, SqliteIndex
 import config
-from utils import cleanup_temp_files as cleanup_old_files, format_file_size as format_size, get_user_display
+import metrics
+from utils import Utils, cleanup_temp_files as cleanup_old_files, format_file_size as format_size, format_duration, log_download, get_download_stats
 
 # Setup logging
 logging.basicConfig(
@@ -21,10 +30,61 @@ logging.basicConfig(
 )
 logger = logging.getLogger(__name__)
 
+# Séparateur des file_id d'une vidéo envoyée en plusieurs parties (une seule entrée d'index)
+PART_SEPARATOR = "\n"
+
+HELP_TEXT = """
+❓ *AIDE*
+
+*Comment utiliser :*
+1. Copiez un lien vidéo Pinterest
+2. Envoyez-le au bot
+3. Choisissez la qualité
+4. Recevez la vidéo
+
+*Problèmes courants :*
+• *Lien non reconnu* : Vérifiez que c'est un lien Pinterest
+• *Téléchargement échoué* : Réessayez ou changez de qualité
+• *Vidéo trop grande* : Téléchargez en qualité inférieure
+
+*Commandes :*
+/start - Démarrer le bot
+/help - Afficher cette aide
+"""
+
 class PinterestBot:
     def __init__(self):
-        self.downloader = PinterestDownloader()
-        self.user_sessions = {}
+        self.storage = Storage(
+            config.DATABASE_PATH,
+            config.DATABASE_BATCH_SIZE,
+            config.DATABASE_COMMIT_INTERVAL
+        )
+        self.downloader = PinterestDownloader(
+            SqliteIndex(self.storage, 'short_links', config.SHORT_LINK_INDEX_MAX_ENTRIES)
+        )
+        self.user_sessions = SessionStore(config.SESSION_TTL, config.SESSION_MAX_ENTRIES)
+        self.file_ids = SqliteIndex(self.storage, 'file_ids', config.FILE_ID_INDEX_MAX_ENTRIES)
+        self.video_cache = VideoCache(
+            config.SUBDIRS["videos"],
+            SqliteIndex(self.storage, 'video_keys', config.VIDEO_CACHE_MAX_ENTRIES),
+            config.VIDEO_CACHE_MAX_SIZE
+        )
+        self.uploads = SingleFlight()
+        self.admission = AdmissionController(
+            config.RATE_LIMIT_PER_HOUR,
+            config.RATE_LIMIT_MESSAGES_PER_MINUTE,
+            config.MAX_GLOBAL_DOWNLOADS,
+            config.MAX_CONCURRENT_DOWNLOADS,
+            config.ADMISSION_MAX_WAIT
+        )
+        self.scheduler = FairScheduler(config.DOWNLOAD_WORKERS, config.SMALL_JOB_SIZE)
+        self.metrics_server = None
+        self.telegram_session = None
+        self.cleanup = None
+        
+        # Valeurs calculées au moment de l'export des métriques
+        metrics.QUEUE_DEPTH.set_function(self.queue_depth)
+        metrics.CACHE_LOOKUPS.set_function(self.cache_lookups)
         
     async def start(self, update: Update, context: ContextTypes.DEFAULT_TYPE):
         """Commande /start"""
@@ -74,7 +134,7 @@ Envoyez-moi un lien pour commencer !
         text = update.message.text.strip()
         user_id = update.effective_user.id
         
-        if not self.downloader.is_valid_url(text):
+        if not is_pinterest_url(text):
             await update.message.reply_text(
                 "❌ *Lien invalide*\n\n"
                 "Veuillez envoyer un lien Pinterest valide :\n"
@@ -85,6 +145,13 @@ Envoyez-moi un lien pour commencer !
             )
             return
         
+        # Limiter le nombre de liens analysés par utilisateur
+        try:
+            self.admission.check_message(user_id)
+        except AdmissionRejected as e:
+            await update.message.reply_text(f"⏳ {e.reason}. Réessayez dans {e.retry_after} s.")
+            return
+        
         # Message d'attente
         wait_msg = await update.message.reply_text("🔍 *Analyse en cours...*", parse_mode='Markdown')
         
@@ -113,13 +180,26 @@ Envoyez-moi un lien pour commencer !
     
     async def show_video_options(self, message, video_info, user_id):
         """Afficher les options de téléchargement"""
-        # Sauvegarder les infos
-        self.user_sessions[user_id] = video_info
+        # Sauvegarder les infos (version compacte)
+        session = self.user_sessions.put(user_id, video_info)
         
         # Créer les boutons
         buttons = []
-        for quality in video_info.get('qualities', []):
+        limit_mb = config.MAX_FILE_SIZE // (1024 * 1024)
+        
+        # Raccourci vers la meilleure qualité envoyable en un seul fichier
+        best_fitting = self.downloader.select_fitting_quality(session['qualities'])
+        if best_fitting is not None:
+            buttons.append([InlineKeyboardButton(
+                f"🎯 Meilleure < {limit_mb} MB : {best_fitting['quality']} ({best_fitting['size']})",
+                callback_data=f"download_{best_fitting['id']}"
+            )])
+        
+        for quality in session['qualities']:
             btn_text = f"⬇️ {quality['quality']} ({quality['size']})"
+            if quality.get('fits') is False:
+                # Trop lourde : sera réduite ou envoyée en plusieurs parties
+                btn_text = f"⚠️ {quality['quality']} ({quality['size']} > {limit_mb} MB)"
             btn_data = f"download_{quality['id']}"
             buttons.append([InlineKeyboardButton(btn_text, callback_data=btn_data)])
         
@@ -137,6 +217,9 @@ Envoyez-moi un lien pour commencer !
 Choisissez une qualité :
         """
         
+        if any(quality.get('fits') is False for quality in session['qualities']):
+            text += f"\n⚠️ = plus de {limit_mb} MB, réduite ou envoyée en plusieurs parties"
+        
         await message.edit_text(
             text,
             reply_markup=InlineKeyboardMarkup(buttons),
@@ -171,11 +254,17 @@ Choisissez une qualité :
             await query.edit_message_text("📤 *Envoyez un nouveau lien Pinterest*", parse_mode='Markdown')
     
     async def process_download(self, query, user_id, quality_id):
-        """Traiter le téléchargement"""
+        """Traiter le téléchargement (durée mesurée par issue)"""
+        started = time.perf_counter()
+        outcome = await self._process_download(query, user_id, quality_id)
+        metrics.PROCESS_SECONDS.observe(time.perf_counter() - started, outcome)
+    
+    async def _process_download(self, query, user_id, quality_id):
+        """Traiter le téléchargement, retourne l'issue (sent, reused, rejected...)"""
         video_info = self.user_sessions.get(user_id)
         if not video_info:
             await query.edit_message_text("❌ Session expirée. Renvoyez le lien.")
-            return
+            return 'expired'
         
         # Trouver la qualité demandée
         quality = None
@@ -186,7 +275,26 @@ Choisissez une qualité :
         
         if not quality:
             await query.edit_message_text("❌ Qualité non disponible")
-            return
+            return 'invalid'
+        
+        caption = (f"🎬 {video_info.get('title', 'Vidéo Pinterest')}\n"
+                   f"📦 {quality['size']} • {quality['quality']}")
+        
+        # Vidéo déjà envoyée : réutiliser le file_id Telegram
+        pin_id = video_info.get('pin_id')
+        file_key = f"{pin_id}:{quality_id}" if pin_id else None
+        file_id = self.file_ids.get(file_key) if file_key else None
+        
+        if file_id:
+            try:
+                await self.send_file_ids(query, file_id, caption)
+                await query.edit_message_text("✅ *Vidéo envoyée !*", parse_mode='Markdown')
+                self.log_result(query, video_info, quality, True)
+                return 'reused'
+            except BadRequest as e:
+                # file_id invalide : on repasse par le téléchargement
+                logger.warning(f"file_id refusé pour {file_key}: {e}")
+                self.file_ids.remove(file_key)
         
         # Démarrer le téléchargement
         await query.edit_message_text(
@@ -196,55 +304,292 @@ Choisissez une qualité :
         )
         
         try:
-            # Télécharger la vidéo
-            result = await self.downloader.download_video(
-                quality['url'],
-                f"{user_id}_{quality_id}"
-            )
-            
-            if not result:
-                await query.edit_message_text("❌ Échec du téléchargement")
-                return
-            
-            # Envoyer la vidéo
-            await query.message.reply_video(
-                video=open(result['path'], 'rb'),
-                caption=f"🎬 {video_info.get('title', 'Vidéo Pinterest')}\n"
-                       f"📦 {quality['size']} • {quality['quality']}",
-                supports_streaming=True
-            )
+            async with self.admission.download_slot(user_id):
+                if file_key:
+                    # Un envoi identique déjà en cours : attendre son file_id
+                    file_id, leader = await self.uploads.join(
+                        file_key,
+                        lambda: self.run_scheduled(
+                            query, user_id, quality,
+                            lambda: self.download_and_send(query, user_id, quality_id, quality, caption, file_key)
+                        )
+                    )
+                    if not leader:
+                        if file_id:
+                            await self.send_file_ids(query, file_id, caption)
+                        else:
+                            # Pas de file_id réutilisable : téléchargement individuel
+                            await self.run_scheduled(
+                                query, user_id, quality,
+                                lambda: self.download_and_send(query, user_id, quality_id, quality, caption, None)
+                            )
+                else:
+                    await self.run_scheduled(
+                        query, user_id, quality,
+                        lambda: self.download_and_send(query, user_id, quality_id, quality, caption, None)
+                    )
             
             await query.edit_message_text("✅ *Vidéo envoyée !*", parse_mode='Markdown')
+            self.log_result(query, video_info, quality, True)
+            return 'sent'
             
-            # Nettoyer
-            os.remove(result['path'])
+        except AdmissionRejected as e:
+            metrics.ERRORS.inc('admission')
+            await query.edit_message_text(f"⏳ {e.reason}. Réessayez dans {e.retry_after} s.")
+            return 'rejected'
             
         except Exception as e:
             logger.error(f"Download error: {e}")
+            metrics.ERRORS.inc('process')
+            self.log_result(query, video_info, quality, False)
             await query.edit_message_text(f"❌ Erreur : {str(e)[:100]}")
+            return 'error'
     
-    async def show_help(self, query):
-        """Afficher l'aide"""
-        help_text = """
-❓ *AIDE*
-
-*Comment utiliser :*
-1. Copiez un lien vidéo Pinterest
-2. Envoyez-le au bot
-3. Choisissez la qualité
-4. Recevez la vidéo
+    def log_result(self, query, video_info, quality, success):
+        """Journaliser un téléchargement (et mettre à jour les compteurs)"""
+        pin_id = video_info.get('pin_id')
+        url = f"https://www.pinterest.com/pin/{pin_id}/" if pin_id else quality['url']
+        username = query.from_user.username or query.from_user.first_name or ''
+        file_size = quality.get('filesize') or 0
+        
+        log_download(query.from_user.id, username, url, success, file_size)
+        self.storage.record_download(
+            query.from_user.id, username, url, pin_id, quality['quality'], success, file_size
+        )
+    
+    async def run_scheduled(self, query, user_id, quality, factory):
+        """Passer par l'ordonnanceur et afficher la position dans la file"""
+        # Taille inconnue : SD considérée comme petite, HD comme grosse
+        size = quality.get('filesize') or (
+            config.SMALL_JOB_SIZE if quality.get('height', 0) <= 480 else config.MAX_FILE_SIZE
+        )
+        job = self.scheduler.submit(user_id, size, factory)
+        
+        last_position = 0
+        try:
+            while True:
+                position, eta = self.scheduler.position(job)
+                if position != last_position:
+                    text = f"📥 *Téléchargement {quality['quality']}...*\n"
+                    if position:
+                        text += (f"⏳ Position dans la file : {position}\n"
+                                 f"Attente estimée : {format_duration(int(eta))}")
+                    else:
+                        text += "Veuillez patienter."
+                    try:
+                        await query.edit_message_text(text, parse_mode='Markdown')
+                    except BadRequest:
+                        pass
+                    last_position = position
+                
+                try:
+                    return await asyncio.wait_for(asyncio.shield(job.future), config.QUEUE_UPDATE_INTERVAL)
+                except asyncio.TimeoutError:
+                    continue
+        except asyncio.CancelledError:
+            job.future.cancel()
+            raise
+    
+    async def download_and_send(self, query, user_id, quality_id, quality, caption, file_key):
+        """Télécharger puis envoyer la vidéo, retourne le file_id Telegram"""
+        # Vidéo déjà sur le disque : ni CDN ni téléchargement
+        if file_key:
+            cached_path = await self.video_cache.get(file_key)
+            if cached_path:
+                try:
+                    return await self.send_file(query, cached_path, caption, file_key)
+                finally:
+                    self.video_cache.release(cached_path)
+        
+        # MP4 direct de taille connue sous la limite : transfert en flux, sans
+        # fichier temporaire (sinon Telegram refuserait après tout le transfert).
+        # Rien n'est écrit sur le disque, donc rien n'entre dans le cache vidéo :
+        # les demandes suivantes réutilisent le file_id mémorisé.
+        if (config.STREAMING_UPLOAD and quality.get('fits')
+                and self.downloader.is_direct_video_url(quality['url'])):
+            try:
+                with metrics.UPLOAD_SECONDS.time('stream'):
+                    file_id = await self.stream_and_send(query, quality, caption)
+                if file_id and file_key:
+                    self.file_ids.put(file_key, file_id)
+                return file_id
+            except Exception as e:
+                metrics.ERRORS.inc('upload_stream')
+                logger.warning(f"Streaming échoué, passage par un fichier: {e}")
+        
+        # Télécharger la vidéo
+        result = await self.downloader.download_video(
+            quality['url'],
+            f"{user_id}_{quality_id}"
+        )
+        
+        if not result:
+            raise RuntimeError("Échec du téléchargement")
+        
+        # Garder la vidéo pour les prochaines demandes du même pin
+        file_path = result['file_path']
+        if file_key:
+            file_path = await self.video_cache.put(file_key, file_path)
+        
+        try:
+            return await self.send_file(query, file_path, caption, file_key)
+        finally:
+            # Nettoyer (ou rendre la vidéo au cache)
+            if file_path == result['file_path']:
+                os.remove(file_path)
+            else:
+                self.video_cache.release(file_path)
+    
+    async def send_file(self, query, file_path, caption, file_key):
+        """Envoyer un fichier vidéo local, retourne le file_id Telegram"""
+        # Trop grande pour Telegram : réduire (remux → downscale → vbv),
+        # sinon envoi en plusieurs parties
+        if os.path.getsize(file_path) > config.MAX_FILE_SIZE:
+            fitted_path = str(config.TEMP_DIR / Utils.generate_unique_filename("fitted"))
+            report = await Utils.fit_video_async(file_path, fitted_path, config.MAX_FILE_SIZE)
+            if report['success']:
+                try:
+                    return await self.send_file(query, fitted_path, caption, file_key)
+                finally:
+                    Utils.cleanup_temp_files(fitted_path)
+            file_id = await self.send_parts(query, file_path, caption)
+        else:
+            with open(file_path, 'rb') as video_file, metrics.UPLOAD_SECONDS.time('file'):
+                message = await query.message.reply_video(
+                    video=video_file,
+                    caption=caption,
+                    supports_streaming=True
+                )
+            file_id = message.video.file_id if message.video else None
+        
+        # Mémoriser le file_id pour les prochaines demandes
+        if file_id and file_key:
+            self.file_ids.put(file_key, file_id)
+        
+        return file_id
+    
+    async def send_parts(self, query, file_path, caption):
+        """
+        Découper la vidéo et envoyer chaque partie dès qu'elle est prête
+        
+        Returns:
+            Optional[str]: file_id des parties joints par PART_SEPARATOR,
+            None si l'une d'elles n'en a pas
+        """
+        max_part_mb = config.RECOMMENDED_MAX_SIZE // (1024 * 1024)
+        file_ids = []
+        complete = True
+        
+        async for part in Utils.split_video_stream(file_path, max_part_mb):
+            try:
+                with open(part, 'rb') as part_file, metrics.UPLOAD_SECONDS.time('part'):
+                    message = await query.message.reply_video(
+                        video=part_file,
+                        caption=f"{caption}\n🧩 Partie {len(file_ids) + 1}",
+                        supports_streaming=True
+                    )
+            finally:
+                if part != file_path:
+                    os.remove(part)
+            
+            if message.video:
+                file_ids.append(message.video.file_id)
+            else:
+                complete = False
+                file_ids.append(None)
+        
+        return PART_SEPARATOR.join(file_ids) if complete and file_ids else None
+    
+    async def send_file_ids(self, query, file_id, caption):
+        """Renvoyer une vidéo déjà envoyée (un file_id, ou un par partie)"""
+        parts = file_id.split(PART_SEPARATOR)
+        with metrics.UPLOAD_SECONDS.time('file_id'):
+            for index, part_id in enumerate(parts, 1):
+                await query.message.reply_video(
+                    video=part_id,
+                    caption=caption if len(parts) == 1 else f"{caption}\n🧩 Partie {index}",
+                    supports_streaming=True
+                )
+    
+    async def stream_and_send(self, query, quality, caption):
+        """Envoyer la vidéo en flux du CDN vers Telegram, retourne le file_id"""
+        bot = query.get_bot()
+        
+        form = aiohttp.FormData()
+        form.add_field('chat_id', str(query.message.chat_id))
+        form.add_field('caption', caption)
+        form.add_field('supports_streaming', 'true')
+        form.add_field(
+            'video',
+            self.downloader.stream_video(
+                quality['url'],
+                config.STREAM_CHUNK_SIZE,
+                config.MAX_FILE_SIZE
+            ),
+            filename=f"pinterest_{quality.get('format_id') or 'video'}.mp4",
+            content_type='video/mp4'
+        )
+        
+        # Corps multipart envoyé en chunked au fil de la lecture du CDN
+        session = self.get_telegram_session()
+        timeout = aiohttp.ClientTimeout(total=None, sock_read=config.HTTP_TIMEOUT * 4)
+        async with session.post(f"{bot.base_url}/sendVideo", data=form, timeout=timeout) as response:
+            payload = await response.json()
+        
+        if not payload.get('ok'):
+            raise RuntimeError(payload.get('description', 'Envoi refusé par Telegram'))
+        
+        video = payload['result'].get('video')
+        return video['file_id'] if video else None
+    
+    def get_telegram_session(self) -> aiohttp.ClientSession:
+        """Session HTTP dédiée à l'API Telegram (sans en-têtes ni compteurs Pinterest)"""
+        if not self.telegram_session or self.telegram_session.closed:
+            self.telegram_session = aiohttp.ClientSession(
+                connector=aiohttp.TCPConnector(
+                    limit=config.HTTP_POOL_LIMIT_PER_HOST,
+                    ttl_dns_cache=config.HTTP_DNS_CACHE_TTL,
+                    keepalive_timeout=config.HTTP_KEEPALIVE_TIMEOUT,
+                )
+            )
+        return self.telegram_session
+    
+    async def show_info(self, query, user_id):
+        """Afficher les informations de la vidéo en attente"""
+        video_info = self.user_sessions.get(user_id)
+        if not video_info:
+            await query.edit_message_text("❌ Session expirée. Renvoyez le lien.")
+            return
+        
+        limit_mb = config.MAX_FILE_SIZE // (1024 * 1024)
+        qualities = "".join(
+            f"\n• {quality['quality']} : {quality['size']}"
+            f"{f' (> {limit_mb} MB)' if quality.get('fits') is False else ''}"
+            for quality in video_info['qualities']
+        )
+        
+        info = f"""
+📊 *INFOS VIDÉO*
 
-*Problèmes courants :*
-• *Lien non reconnu* : Vérifiez que c'est un lien Pinterest
-• *Téléchargement échoué* : Réessayez ou changez de qualité
-• *Vidéo trop grande* : Téléchargez en qualité inférieure
+*Titre :* {video_info['title']}
+*Durée :* {video_info['duration']}
+*Pin :* {video_info.get('pin_id') or 'Inconnu'}
 
-*Commandes :*
-/start - Démarrer le bot
-/help - Afficher cette aide
+*Qualités :*{qualities}
         """
         
-        await query.edit_message_text(help_text, parse_mode='Markdown')
+        buttons = [[InlineKeyboardButton(f"⬇️ {quality['quality']}", callback_data=f"download_{quality['id']}")]
+                   for quality in video_info['qualities']]
+        await query.edit_message_text(info, reply_markup=InlineKeyboardMarkup(buttons), parse_mode='Markdown')
+    
+    async def help_command(self, update: Update, context: ContextTypes.DEFAULT_TYPE):
+        """Commande /help"""
+        await update.message.reply_text(HELP_TEXT, parse_mode='Markdown')
+    
+    async def show_help(self, query):
+        """Afficher l'aide"""
+        await query.edit_message_text(HELP_TEXT, parse_mode='Markdown')
+    
     
     async def show_settings(self, query):
         """Afficher les paramètres"""
@@ -270,16 +615,50 @@ Choisissez une qualité :
     
     async def show_stats(self, query, user_id):
         """Afficher les statistiques"""
+        server = self.downloader.get_stats()
+        workers = server['workers']
+        metadata = server['metadata_cache']
+        file_ids = self.file_ids.stats()
+        videos = self.video_cache.stats()
+        http = server['http']
+        fast = server['extraction']['fast']
+        admission = self.admission.stats()
+        sessions = self.user_sessions.stats()
+        scheduler = self.scheduler.stats()
+        user = await self.storage.user_stats(user_id)
+        downloads = get_download_stats()
+        last = datetime.fromtimestamp(user['last_at']).strftime('%d/%m/%Y %H:%M') if user['last_at'] else "Jamais"
+        recent = "".join(
+            f"\n• {datetime.fromtimestamp(entry['created_at']).strftime('%d/%m %H:%M')} — "
+            f"{entry['quality']} {'✅' if entry['success'] else '❌'}"
+            for entry in user['recent']
+        )
+        
         stats = f"""
 📊 *STATISTIQUES*
 
 *Utilisateur :* {query.from_user.first_name}
-*Téléchargements :* 0
-*Dernier :* Jamais
+*Téléchargements :* {user['success']} ({format_size(user['bytes'])}), {user['failed']} échec(s)
+*Dernier :* {last}{recent}
+
+*Serveur :*
+• Téléchargements : {downloads['total_downloads']} au total, {downloads['today_downloads']} aujourd'hui ({downloads['total_size_formatted']})
+• Workers : {workers['active']}/{workers['size']} actifs
+• File d'attente : {workers['queued']}/{workers['queue_size']}
+• Traités : {workers['completed']} (rejetés : {workers['rejected']})
+• Cache : {metadata['entries']} pins, {metadata['hit_rate']:.0%} de succès
+• Vidéos réutilisées : {file_ids['hits']} ({file_ids['entries']} en index)
+• Cache vidéo : {videos['entries']} fichiers ({format_size(videos['size'])}), {videos['hit_rate']:.0%} de succès, {format_size(videos['bytes_saved'])} économisés
+• Connexions HTTP : {http['connections_reused']} réutilisées / {http['connections_created']} ouvertes
+• Extraction rapide : {fast['hit_rate']:.0%} de succès
+• En cours : {scheduler['running']}/{scheduler['workers']}, {scheduler['queued']} en file
+• Créneaux : {admission['active_downloads']}/{admission['max_global']} occupés (refus : {admission['rejected_rate'] + admission['rejected_busy']})
+• Sessions : {sessions['size']}/{sessions['max_entries']} (expirées : {sessions['expirations']}, évincées : {sessions['evictions']})
 
 *Limites :*
+• {config.RATE_LIMIT_PER_HOUR} téléchargements par heure
+• {config.MAX_CONCURRENT_DOWNLOADS} téléchargement(s) simultané(s)
 • Taille : 50MB max
-• Pas de limite quotidienne
 • Fichiers temporaires
 
 *Conseil :*
@@ -291,25 +670,82 @@ Utilisez le WiFi pour les vidéos HD !
     async def cleanup_task(self):
         """Nettoyage périodique"""
         while True:
-            cleanup_old_files("temp", max_age_hours=1)
+            cleanup_old_files(max_age_hours=config.TEMP_FILE_RETENTION_HOURS)
+            # Les téléchargements partiels ont leur propre durée de conservation
+            self.downloader.partials.purge()
             await asyncio.sleep(3600)  # Toutes les heures
     
+    async def startup(self, application: Application):
+        """Initialiser les ressources partagées au démarrage du bot"""
+        await self.downloader.start()
+        Utils.start_log_writer()
+        # Tâche de nettoyage, dans la boucle de l'application
+        self.cleanup = asyncio.create_task(self.cleanup_task())
+        
+        if config.METRICS_ENABLED:
+            try:
+                self.metrics_server = await metrics.start_server(config.METRICS_HOST, config.METRICS_PORT)
+                logger.info(f"Métriques sur http://{config.METRICS_HOST}:{config.METRICS_PORT}/metrics")
+            except OSError as e:
+                logger.warning(f"Serveur de métriques indisponible: {e}")
+    
+    def queue_depth(self):
+        """Téléchargements en attente / en cours (jauge de métriques)"""
+        stats = self.scheduler.stats()
+        return {('queued',): stats['queued'], ('running',): stats['running']}
+    
+    def cache_lookups(self):
+        """Succès et échecs de chaque cache (compteurs de métriques)"""
+        caches = {
+            'metadata': self.downloader.metadata_cache.stats(),
+            'size_probe': self.downloader.size_probe_stats,
+            'file_id': self.file_ids.stats(),
+            'video': self.video_cache.stats(),
+        }
+        lookups = {}
+        for name, stats in caches.items():
+            lookups[(name, 'hit')] = stats['hits']
+            lookups[(name, 'miss')] = stats['misses']
+        return lookups
+    
+    async def shutdown(self, application: Application):
+        """Libérer les ressources à l'arrêt du bot"""
+        if self.metrics_server:
+            self.metrics_server.close()
+            await self.metrics_server.wait_closed()
+        if self.cleanup:
+            self.cleanup.cancel()
+        self.scheduler.stop()
+        await self.downloader.close()
+        if self.telegram_session:
+            await self.telegram_session.close()
+        # Écrire les journaux en attente avant l'instantané des compteurs
+        await Utils.stop_log_writer()
+        await Utils.save_download_stats_async()
+        # Valider les dernières écritures SQLite
+        await asyncio.to_thread(self.storage.close)
+    
     def run(self):
         """Lancer le bot"""
         # Créer l'application
-        app = Application.builder().token(config.TOKEN).build()
+        app = (
+            Application.builder()
+            .token(config.TELEGRAM_TOKEN)
+            # Mises à jour traitées en parallèle : un téléchargement long ne bloque
+            # ni /start ni les autres discussions (limites : admission et ordonnanceur)
+            .concurrent_updates(True)
+            .post_init(self.startup)
+            .post_shutdown(self.shutdown)
+            .build()
+        )
         
         # Ajouter les handlers
         app.add_handler(CommandHandler("start", self.start))
-        app.add_handler(CommandHandler("help", self.show_help))
+        app.add_handler(CommandHandler("help", self.help_command))
         
         app.add_handler(MessageHandler(filters.TEXT & ~filters.COMMAND, self.handle_message))
         app.add_handler(CallbackQueryHandler(self.handle_callback))
         
-        # Démarrer la tâche de nettoyage
-        loop = asyncio.get_event_loop()
-        loop.create_task(self.cleanup_task())
-        
         # Lancer le bot
         print("🤖 Pinterest Downloader Bot démarré !")
         print(f"👤 Nom : {config.BOT_NAME}")
@@ -319,13 +755,13 @@ Utilisez le WiFi pour les vidéos HD !
 
 if __name__ == "__main__":
     # Vérifier le token
-    if not hasattr(config, 'TOKEN') or config.TOKEN == "TON_TOKEN_ICI":
+    if not config.TELEGRAM_TOKEN or config.TELEGRAM_TOKEN == "TON_TOKEN_ICI":
         print("\n⚠️  CONFIGURATION REQUISE")
         print("="*50)
         print("1. Créez un bot sur Telegram avec @BotFather")
         print("2. Copiez le token")
-        print("3. Éditez le fichier config.py")
-        print("4. Remplacez 'TON_TOKEN_ICI' par votre token")
+        print("3. Définissez la variable d'environnement TELEGRAM_TOKEN")
+        print("   (ou ajoutez TELEGRAM_TOKEN=... dans le fichier .env)")
         print("="*50)
         exit(1)
     
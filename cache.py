@@ -0,0 +1,362 @@
+"""
+Caches persistants du Pinterest Video Downloader Bot
+Stockés dans les dossiers SUBDIRS["cache"] et SUBDIRS["videos"] pour survivre aux redémarrages
+"""
+
+import os
+import json
+import time
+import shutil
+import asyncio
+import itertools
+from collections import OrderedDict
+from pathlib import Path
+from typing import Dict, List, Optional, Set, Tuple
+
+from utils import Utils
+
+
+class MetadataCache:
+    """Cache LRU persistant des métadonnées vidéo, indexé par ID de pin"""
+
+    def __init__(self, directory: Path, ttl: int, max_size: int):
+        self.directory = Path(directory) / "metadata"
+        self.directory.mkdir(parents=True, exist_ok=True)
+        self.ttl = ttl
+        self.max_size = max_size
+
+        # pin_id -> (date de stockage, taille sérialisée, données), ordre LRU
+        self._entries: "OrderedDict[str, Tuple[float, int, Dict]]" = OrderedDict()
+        self.total_size = 0
+
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+        self._load()
+
+    def _path(self, pin_id: str) -> Path:
+        return self.directory / f"{pin_id}.json"
+
+    def _load(self):
+        """Recharger les entrées encore valides depuis le disque"""
+        now = time.time()
+        loaded = []
+
+        for entry in os.scandir(self.directory):
+            if not entry.name.endswith('.json'):
+                continue
+            try:
+                with open(entry.path, 'r', encoding='utf-8') as f:
+                    raw = f.read()
+                record = json.loads(raw)
+                stored_at = record['stored_at']
+            except (OSError, ValueError, KeyError):
+                Utils.remove_file(entry.path)
+                continue
+
+            if now - stored_at > self.ttl:
+                Utils.remove_file(entry.path)
+                continue
+
+            loaded.append((stored_at, entry.name[:-5], len(raw), record['data']))
+
+        # Les plus anciennes en tête de l'ordre LRU
+        for stored_at, pin_id, size, data in sorted(loaded, key=lambda x: x[0]):
+            self._entries[pin_id] = (stored_at, size, data)
+            self.total_size += size
+
+        self._evict()
+
+    def get(self, pin_id: str) -> Optional[Dict]:
+        """
+        Lire une entrée du cache
+
+        Args:
+            pin_id: ID numérique du pin
+
+        Returns:
+            Optional[Dict]: Copie des métadonnées ou None si absente/expirée
+        """
+        entry = self._entries.get(pin_id)
+        if entry is None:
+            self.misses += 1
+            return None
+
+        stored_at, size, data = entry
+        if time.time() - stored_at > self.ttl:
+            self._discard(pin_id)
+            self.misses += 1
+            return None
+
+        self._entries.move_to_end(pin_id)
+        self.hits += 1
+        return dict(data)
+
+    def put(self, pin_id: str, data: Dict):
+        """
+        Enregistrer les métadonnées d'un pin
+
+        Args:
+            pin_id: ID numérique du pin
+            data: Dictionnaire video_info formaté
+        """
+        stored_at = time.time()
+        raw = json.dumps({'stored_at': stored_at, 'data': data}, ensure_ascii=False)
+        size = len(raw)
+
+        if size > self.max_size:
+            return
+
+        if pin_id in self._entries:
+            self._discard(pin_id)
+
+        try:
+            tmp_path = self._path(pin_id).with_suffix('.tmp')
+            with open(tmp_path, 'w', encoding='utf-8') as f:
+                f.write(raw)
+            os.replace(tmp_path, self._path(pin_id))
+        except OSError as e:
+            print(f"⚠️ Erreur écriture cache {pin_id}: {e}")
+
+        self._entries[pin_id] = (stored_at, size, dict(data))
+        self.total_size += size
+        self._evict()
+
+    def _evict(self):
+        """Supprimer les entrées les moins récemment utilisées au-delà de la limite"""
+        while self.total_size > self.max_size and self._entries:
+            pin_id = next(iter(self._entries))
+            self._discard(pin_id)
+            self.evictions += 1
+
+    def _discard(self, pin_id: str):
+        stored_at, size, data = self._entries.pop(pin_id)
+        self.total_size -= size
+        Utils.remove_file(self._path(pin_id))
+
+    def stats(self) -> Dict:
+        """Obtenir les statistiques du cache"""
+        lookups = self.hits + self.misses
+        return {
+            'entries': len(self._entries),
+            'size': self.total_size,
+            'max_size': self.max_size,
+            'hits': self.hits,
+            'misses': self.misses,
+            'evictions': self.evictions,
+            'hit_rate': self.hits / lookups if lookups else 0.0,
+        }
+
+
+class VideoCache:
+    """
+    Cache disque des vidéos adressé par contenu (hash MD5), borné en octets
+
+    get() et put() prêtent le fichier retourné à l'appelant, qui le rend avec
+    release() une fois l'envoi terminé : l'éviction ignore les fichiers prêtés.
+    """
+
+    # Nombre de vidéos les moins récemment utilisées comparées à l'éviction :
+    # la moins demandée d'entre elles est supprimée (LRU + LFU)
+    EVICTION_SAMPLE = 4
+
+    def __init__(self, directory: Path, keys, max_size: int):
+        """
+        Args:
+            directory: Dossier des vidéos
+            keys: Index pin_id:format_id -> hash (get/put/remove/items)
+            max_size: Taille maximale du cache en bytes
+        """
+        self.directory = Path(directory)
+        self.directory.mkdir(parents=True, exist_ok=True)
+        self.max_size = max_size
+        self.keys = keys
+
+        # hash -> [dernier accès, taille, lectures, intégrité vérifiée], ordre LRU
+        self._blobs: "OrderedDict[str, List]" = OrderedDict()
+        self.total_size = 0
+        # hash -> clés de l'index qui y mènent (oubliées avec la vidéo)
+        self._aliases: Dict[str, Set[str]] = {}
+        # hash -> nombre de lecteurs en cours (fichier protégé de l'éviction)
+        self._leases: Dict[str, int] = {}
+
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.corrupted = 0
+        self.bytes_saved = 0
+
+        self._load()
+
+    def _path(self, file_hash: str) -> Path:
+        return self.directory / f"{file_hash}.mp4"
+
+    def _load(self):
+        """Reconstruire l'index en mémoire à partir des seuls noms et dates des fichiers"""
+        found = []
+        for entry in os.scandir(self.directory):
+            file_hash, ext = os.path.splitext(entry.name)
+            if ext != '.mp4' or len(file_hash) != 32:
+                continue
+            try:
+                stat = entry.stat()
+            except OSError:
+                continue
+            found.append((stat.st_mtime, file_hash, stat.st_size))
+
+        # Intégrité vérifiée paresseusement, à la première lecture
+        for last_access, file_hash, size in sorted(found):
+            self._blobs[file_hash] = [last_access, size, 0, False]
+            self.total_size += size
+
+        for key, file_hash in list(self.keys.items()):
+            if file_hash in self._blobs:
+                self._aliases.setdefault(file_hash, set()).add(key)
+            else:
+                self.keys.remove(key)
+
+        self._evict()
+
+    async def get(self, key: str) -> Optional[str]:
+        """
+        Obtenir le chemin de la vidéo en cache
+
+        Args:
+            key: Clé pin_id:format_id
+
+        Returns:
+            Optional[str]: Chemin du fichier prêté (à rendre avec release()),
+            ou None si absent/corrompu
+        """
+        file_hash = self.keys.get(key)
+        blob = self._blobs.get(file_hash) if file_hash else None
+        if blob is None:
+            if file_hash:
+                self.keys.remove(key)
+            self.misses += 1
+            return None
+
+        path = self._path(file_hash)
+        self._lease(file_hash)
+        if not blob[3]:
+            try:
+                actual = await asyncio.to_thread(Utils.get_file_hash, str(path))
+            except BaseException:
+                self.release(str(path))
+                raise
+            if actual != file_hash:
+                self.release(str(path))
+                if file_hash in self._blobs:
+                    self._discard(file_hash)
+                self.keys.remove(key)
+                self.corrupted += 1
+                self.misses += 1
+                return None
+            blob[3] = True
+
+        blob[0] = time.time()
+        blob[2] += 1
+        self._blobs.move_to_end(file_hash)
+        try:
+            # La date de modification conserve l'ordre LRU après redémarrage
+            os.utime(path)
+        except OSError:
+            pass
+
+        self.hits += 1
+        self.bytes_saved += blob[1]
+        return str(path)
+
+    async def put(self, key: str, file_path: str) -> str:
+        """
+        Déplacer une vidéo téléchargée dans le cache
+
+        Args:
+            key: Clé pin_id:format_id
+            file_path: Fichier téléchargé (déplacé ou supprimé si doublon)
+
+        Returns:
+            str: Chemin de la vidéo en cache (prêtée, à rendre avec release()),
+            ou file_path si non mise en cache
+        """
+        size = os.path.getsize(file_path)
+        if size > self.max_size:
+            return file_path
+
+        file_hash = await asyncio.to_thread(Utils.get_file_hash, file_path)
+        if not file_hash:
+            return file_path
+
+        path = self._path(file_hash)
+        try:
+            if file_hash in self._blobs:
+                # Contenu identique déjà présent sous une autre clé
+                os.remove(file_path)
+            else:
+                await asyncio.to_thread(shutil.move, file_path, path)
+        except OSError as e:
+            print(f"⚠️ Erreur mise en cache vidéo {key}: {e}")
+            return file_path
+
+        # Revérifié après le déplacement : un put concurrent du même contenu
+        # a pu l'enregistrer entre-temps
+        if file_hash in self._blobs:
+            self._blobs[file_hash][0] = time.time()
+            self._blobs.move_to_end(file_hash)
+        else:
+            self._blobs[file_hash] = [time.time(), size, 0, True]
+            self.total_size += size
+
+        self.keys.put(key, file_hash)
+        self._aliases.setdefault(file_hash, set()).add(key)
+        self._lease(file_hash)
+        self._evict()
+        return str(path)
+
+    def _lease(self, file_hash: str):
+        self._leases[file_hash] = self._leases.get(file_hash, 0) + 1
+
+    def release(self, path: str):
+        """Rendre un fichier obtenu par get() ou put()"""
+        file_hash = Path(path).stem
+        remaining = self._leases.pop(file_hash, 0) - 1
+        if remaining > 0:
+            self._leases[file_hash] = remaining
+        else:
+            # Éviction éventuellement différée tant que le fichier était lu
+            self._evict()
+
+    def _evict(self):
+        """Libérer de la place au-delà de max_size (fichiers prêtés exceptés)"""
+        while self.total_size > self.max_size and self._blobs:
+            unleased = (file_hash for file_hash in self._blobs if file_hash not in self._leases)
+            candidates = list(itertools.islice(unleased, self.EVICTION_SAMPLE))
+            if not candidates:
+                break
+            victim = min(candidates, key=lambda file_hash: self._blobs[file_hash][2])
+            self._discard(victim)
+            self.evictions += 1
+
+    def _discard(self, file_hash: str):
+        last_access, size, reads, verified = self._blobs.pop(file_hash)
+        self.total_size -= size
+        for key in self._aliases.pop(file_hash, ()):
+            self.keys.remove(key)
+        Utils.remove_file(self._path(file_hash))
+
+    def stats(self) -> Dict:
+        """Obtenir les statistiques du cache vidéo"""
+        lookups = self.hits + self.misses
+        return {
+            'entries': len(self._blobs),
+            'leased': len(self._leases),
+            'size': self.total_size,
+            'max_size': self.max_size,
+            'hits': self.hits,
+            'misses': self.misses,
+            'hit_rate': self.hits / lookups if lookups else 0.0,
+            'bytes_saved': self.bytes_saved,
+            'evictions': self.evictions,
+            'corrupted': self.corrupted,
+        }
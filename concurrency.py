@@ -0,0 +1,523 @@
+"""
+Outils de concurrence du Pinterest Video Downloader Bot
+Exécution des appels bloquants hors de la boucle asyncio
+"""
+
+import asyncio
+import contextlib
+import heapq
+import math
+import time
+from collections import OrderedDict
+from concurrent.futures import Executor, ProcessPoolExecutor, ThreadPoolExecutor
+from typing import Any, AsyncIterator, Awaitable, Callable, Dict, Hashable, List, Optional, Tuple
+
+
+class WorkerPoolFullError(RuntimeError):
+    """Levée quand tous les workers sont occupés et la file d'attente pleine"""
+
+
+class WorkerPool:
+    """Pool borné de workers (threads ou processus) pour les appels bloquants"""
+
+    def __init__(self, size: int, queue_size: int, kind: str = "thread"):
+        self.size = max(1, size)
+        self.queue_size = max(0, queue_size)
+        self.kind = kind
+
+        if kind == "process":
+            self.executor: Executor = ProcessPoolExecutor(max_workers=self.size)
+        else:
+            self.kind = "thread"
+            self.executor = ThreadPoolExecutor(max_workers=self.size, thread_name_prefix="worker")
+
+        # Compteurs exposés dans les statistiques
+        self.active = 0
+        self.queued = 0
+        self.completed = 0
+        self.failed = 0
+        self.rejected = 0
+        self.total_wait = 0.0
+        self.total_run = 0.0
+
+        # Créé à la première utilisation, dans la boucle du bot
+        self._slots: Optional[asyncio.Semaphore] = None
+
+    async def run(self, func: Callable, *args: Any) -> Any:
+        """
+        Exécuter une fonction bloquante dans le pool
+
+        Args:
+            func: Fonction à exécuter (picklable en mode "process")
+            *args: Arguments de la fonction
+
+        Returns:
+            Any: Résultat de la fonction
+
+        Raises:
+            WorkerPoolFullError: Si la file d'attente est pleine
+        """
+        if self.active + self.queued >= self.size + self.queue_size:
+            self.rejected += 1
+            raise WorkerPoolFullError(
+                f"Pool saturé ({self.active} actifs, {self.queued} en attente)"
+            )
+
+        if self._slots is None:
+            self._slots = asyncio.Semaphore(self.size)
+
+        loop = asyncio.get_running_loop()
+        queued_at = time.monotonic()
+        self.queued += 1
+        try:
+            await self._slots.acquire()
+        finally:
+            self.queued -= 1
+
+        started_at = time.monotonic()
+        self.total_wait += started_at - queued_at
+        self.active += 1
+
+        def release(_future):
+            # Le slot n'est libéré qu'à la fin réelle du worker,
+            # même si l'appelant a été annulé entre-temps
+            loop.call_soon_threadsafe(self._release, started_at)
+
+        try:
+            future = self.executor.submit(func, *args)
+        except Exception:
+            self._release(started_at)
+            self.failed += 1
+            raise
+        future.add_done_callback(release)
+
+        try:
+            result = await asyncio.wrap_future(future)
+        except Exception:
+            self.failed += 1
+            raise
+
+        self.completed += 1
+        return result
+
+    def _release(self, started_at: float):
+        """Libérer un slot du pool"""
+        self.active -= 1
+        self.total_run += time.monotonic() - started_at
+        if self._slots is not None:
+            self._slots.release()
+
+    def stats(self) -> Dict:
+        """
+        Obtenir les statistiques du pool
+
+        Returns:
+            Dict: Taille, file d'attente, compteurs et temps moyens
+        """
+        finished = self.completed + self.failed
+        return {
+            'type': self.kind,
+            'size': self.size,
+            'queue_size': self.queue_size,
+            'active': self.active,
+            'queued': self.queued,
+            'completed': self.completed,
+            'failed': self.failed,
+            'rejected': self.rejected,
+            'avg_wait': self.total_wait / finished if finished else 0.0,
+            'avg_run': self.total_run / finished if finished else 0.0,
+        }
+
+    def shutdown(self):
+        """Arrêter le pool sans attendre les tâches en cours"""
+        self.executor.shutdown(wait=False, cancel_futures=True)
+
+
+class SingleFlight:
+    """Regroupe les appels concurrents identiques sur une seule exécution"""
+
+    def __init__(self):
+        self._inflight: Dict[Hashable, asyncio.Task] = {}
+        self.leaders = 0
+        self.followers = 0
+
+    async def run(self, key: Hashable, factory: Callable[[], Awaitable]) -> Any:
+        """
+        Exécuter factory() une seule fois pour tous les appelants concurrents
+
+        Args:
+            key: Clé identifiant le travail (ex: pin + format)
+            factory: Fonction créant la coroutine à partager
+
+        Returns:
+            Any: Résultat partagé (ou exception propagée à tous les appelants)
+        """
+        result, _leader = await self.join(key, factory)
+        return result
+
+    async def join(self, key: Hashable, factory: Callable[[], Awaitable]) -> Tuple[Any, bool]:
+        """
+        Comme run(), en indiquant si cet appelant a lancé l'exécution
+
+        Le rôle est décidé au moment de rejoindre, sans await intermédiaire :
+        un test préalable pourrait être périmé quand l'appelant arrive ici.
+
+        Returns:
+            Tuple[Any, bool]: (résultat partagé, True si meneur)
+        """
+        task = self._inflight.get(key)
+        leader = task is None
+
+        if leader:
+            task = asyncio.ensure_future(factory())
+            self._inflight[key] = task
+            task.add_done_callback(lambda done: self._done(key, done))
+            self.leaders += 1
+        else:
+            self.followers += 1
+
+        # shield : l'annulation d'un appelant n'annule pas le travail partagé
+        return await asyncio.shield(task), leader
+
+    def _done(self, key: Hashable, task: asyncio.Task):
+        if self._inflight.get(key) is task:
+            del self._inflight[key]
+        # Marquer l'exception comme lue si tous les appelants sont partis
+        if not task.cancelled():
+            task.exception()
+
+    def stats(self) -> Dict:
+        """Obtenir les statistiques de déduplication"""
+        return {
+            'in_flight': len(self._inflight),
+            'leaders': self.leaders,
+            'followers': self.followers,
+        }
+
+
+class AdmissionRejected(Exception):
+    """Levée quand une demande est refusée par le contrôle d'admission"""
+
+    def __init__(self, retry_after: float, reason: str):
+        super().__init__(reason)
+        self.retry_after = max(1, math.ceil(retry_after))
+        self.reason = reason
+
+
+class RateLimiter:
+    """Seaux à jetons par utilisateur (mémoire O(1) par utilisateur actif)"""
+
+    def __init__(self, capacity: int, period: float):
+        self.capacity = max(1, capacity)
+        self.rate = self.capacity / period  # jetons par seconde
+
+        # Un seau inactif pendant une période complète est plein : on l'oublie
+        self.idle_ttl = period
+
+        # user_id -> (jetons, dernière mise à jour), du moins au plus récent
+        self._buckets: "OrderedDict[Hashable, Tuple[float, float]]" = OrderedDict()
+        self.rejected = 0
+        self.evicted = 0
+
+    def try_acquire(self, user_id: Hashable) -> float:
+        """
+        Consommer un jeton pour l'utilisateur
+
+        Args:
+            user_id: Identifiant de l'utilisateur
+
+        Returns:
+            float: 0 si accepté, sinon délai d'attente en secondes
+        """
+        now = time.monotonic()
+        self._evict_idle(now)
+
+        tokens = self._refill(user_id, now)
+        if tokens >= 1:
+            self._buckets[user_id] = (tokens - 1, now)
+            return 0.0
+
+        self._buckets[user_id] = (tokens, now)
+        self.rejected += 1
+        return (1 - tokens) / self.rate
+
+    def refund(self, user_id: Hashable):
+        """Rendre un jeton consommé pour une demande finalement refusée"""
+        now = time.monotonic()
+        tokens = self._refill(user_id, now)
+        self._buckets[user_id] = (min(self.capacity, tokens + 1), now)
+
+    def _refill(self, user_id: Hashable, now: float) -> float:
+        bucket = self._buckets.pop(user_id, None)
+        if bucket is None:
+            return float(self.capacity)
+        tokens, last = bucket
+        return min(self.capacity, tokens + (now - last) * self.rate)
+
+    def _evict_idle(self, now: float):
+        """Supprimer les seaux inactifs (coût amorti O(1))"""
+        while self._buckets:
+            user_id, (tokens, last) = next(iter(self._buckets.items()))
+            if now - last < self.idle_ttl:
+                break
+            del self._buckets[user_id]
+            self.evicted += 1
+
+    def __len__(self) -> int:
+        return len(self._buckets)
+
+
+class AdmissionController:
+    """Contrôle d'admission : limites par utilisateur et concurrence globale"""
+
+    def __init__(self, downloads_per_hour: int, messages_per_minute: int,
+                 max_global: int, max_per_user: int, max_wait: float):
+        self.downloads = RateLimiter(downloads_per_hour, 3600)
+        self.messages = RateLimiter(messages_per_minute, 60)
+        self.max_global = max(1, max_global)
+        self.max_per_user = max(1, max_per_user)
+        self.max_wait = max_wait
+
+        # Uniquement les utilisateurs ayant un téléchargement en cours
+        self._active: Dict[Hashable, int] = {}
+        self._slots: Optional[asyncio.Semaphore] = None
+        self.rejected_busy = 0
+        self.rejected_concurrent = 0
+
+    def check_message(self, user_id: Hashable):
+        """
+        Vérifier la limite de messages analysés
+
+        Raises:
+            AdmissionRejected: Si l'utilisateur envoie trop de liens
+        """
+        wait = self.messages.try_acquire(user_id)
+        if wait:
+            raise AdmissionRejected(wait, "Trop de liens envoyés")
+
+    @contextlib.asynccontextmanager
+    async def download_slot(self, user_id: Hashable) -> AsyncIterator[None]:
+        """
+        Réserver un créneau de téléchargement pour l'utilisateur
+
+        Raises:
+            AdmissionRejected: Si une limite est atteinte
+        """
+        if self._active.get(user_id, 0) >= self.max_per_user:
+            self.rejected_concurrent += 1
+            raise AdmissionRejected(self.max_wait, "Un téléchargement est déjà en cours")
+
+        wait = self.downloads.try_acquire(user_id)
+        if wait:
+            raise AdmissionRejected(wait, "Limite de téléchargements atteinte")
+
+        if self._slots is None:
+            self._slots = asyncio.Semaphore(self.max_global)
+
+        try:
+            await asyncio.wait_for(self._slots.acquire(), self.max_wait)
+        except asyncio.TimeoutError:
+            self.downloads.refund(user_id)
+            self.rejected_busy += 1
+            raise AdmissionRejected(self.max_wait, "Serveur occupé")
+
+        self._active[user_id] = self._active.get(user_id, 0) + 1
+        try:
+            yield
+        finally:
+            remaining = self._active.pop(user_id) - 1
+            if remaining:
+                self._active[user_id] = remaining
+            self._slots.release()
+
+    def stats(self) -> Dict:
+        """Obtenir les statistiques d'admission"""
+        return {
+            'active_downloads': sum(self._active.values()),
+            'max_global': self.max_global,
+            'tracked_users': len(self.downloads) + len(self.messages),
+            'rejected_rate': self.downloads.rejected + self.messages.rejected,
+            'rejected_busy': self.rejected_busy,
+            'rejected_concurrent': self.rejected_concurrent,
+            'evicted_buckets': self.downloads.evicted + self.messages.evicted,
+        }
+
+
+class ScheduledJob:
+    """Téléchargement en attente dans le FairScheduler"""
+
+    __slots__ = ('user_id', 'size', 'seq', 'factory', 'future')
+
+    def __init__(self, user_id: Hashable, size: int, seq: int,
+                 factory: Callable[[], Awaitable], future: asyncio.Future):
+        self.user_id = user_id
+        self.size = size
+        self.seq = seq
+        self.factory = factory
+        self.future = future
+
+    def __lt__(self, other: "ScheduledJob") -> bool:
+        return (self.size, self.seq) < (other.size, other.seq)
+
+
+class FairScheduler:
+    """
+    Ordonnanceur de téléchargements à nombre fixe de workers
+
+    Tourniquet entre utilisateurs ; les petits fichiers passent devant
+    les gros, sans jamais affamer ces derniers.
+    """
+
+    def __init__(self, workers: int, small_job_size: int, max_small_streak: int = 3):
+        self.workers = max(1, workers)
+        self.small_job_size = small_job_size
+        self.max_small_streak = max(1, max_small_streak)
+
+        # user_id -> tas de ScheduledJob (plus petit d'abord), ordre = tourniquet
+        self._queues: "OrderedDict[Hashable, List[ScheduledJob]]" = OrderedDict()
+        self._small_streak = 0
+        self._seq = 0
+
+        self._available: Optional[asyncio.Semaphore] = None
+        self._tasks: List[asyncio.Task] = []
+
+        self.running = 0
+        self.completed = 0
+        # Durée moyenne d'un téléchargement (moyenne mobile exponentielle)
+        self.avg_duration = 20.0
+
+    def submit(self, user_id: Hashable, size: int,
+               factory: Callable[[], Awaitable]) -> ScheduledJob:
+        """
+        Ajouter un téléchargement à la file
+
+        Args:
+            user_id: ID de l'utilisateur
+            size: Taille estimée du fichier en bytes
+            factory: Fonction créant la coroutine du téléchargement
+
+        Returns:
+            ScheduledJob: Tâche dont job.future porte le résultat
+        """
+        self._start()
+
+        self._seq += 1
+        job = ScheduledJob(user_id, size, self._seq, factory,
+                           asyncio.get_running_loop().create_future())
+        heapq.heappush(self._queues.setdefault(user_id, []), job)
+        self._available.release()
+        return job
+
+    def position(self, job: ScheduledJob) -> Tuple[int, float]:
+        """
+        Calculer la position d'une tâche dans la file et son attente estimée
+
+        Returns:
+            Tuple[int, float]: (position à partir de 1, secondes) ou (0, 0) si démarrée
+        """
+        if job.user_id not in self._queues or job not in self._queues[job.user_id]:
+            return 0, 0.0
+
+        # Simulation de l'ordre de service sur une copie de la file
+        queues = OrderedDict((user, list(heap)) for user, heap in self._queues.items())
+        streak = self._small_streak
+        position = 0
+
+        while queues:
+            popped, streak = self._pop(queues, streak)
+            if popped.future.cancelled():
+                continue
+            position += 1
+            if popped is job:
+                break
+
+        eta = math.ceil(position / self.workers) * self.avg_duration
+        return position, eta
+
+    def _pop(self, queues: "OrderedDict[Hashable, List[ScheduledJob]]",
+             streak: int) -> Tuple[ScheduledJob, int]:
+        """Retirer la prochaine tâche à servir"""
+        first_small = first_large = None
+        for user_id, heap in queues.items():
+            if heap[0].size <= self.small_job_size:
+                if first_small is None:
+                    first_small = user_id
+            elif first_large is None:
+                first_large = user_id
+            if first_small is not None and first_large is not None:
+                break
+
+        # Les petits passent devant, sauf après une série trop longue
+        if first_small is not None and (first_large is None or streak < self.max_small_streak):
+            user_id = first_small
+            streak = streak + 1 if first_large is not None else 0
+        else:
+            user_id = first_large
+            streak = 0
+
+        heap = queues[user_id]
+        job = heapq.heappop(heap)
+        if heap:
+            queues.move_to_end(user_id)
+        else:
+            del queues[user_id]
+        return job, streak
+
+    def _start(self):
+        """Démarrer les workers dans la boucle courante"""
+        if self._tasks:
+            return
+        self._available = asyncio.Semaphore(0)
+        self._tasks = [asyncio.ensure_future(self._worker()) for _ in range(self.workers)]
+
+    async def _worker(self):
+        while True:
+            await self._available.acquire()
+            job, self._small_streak = self._pop(self._queues, self._small_streak)
+
+            # L'utilisateur a abandonné avant le démarrage
+            if job.future.cancelled():
+                continue
+
+            self.running += 1
+            started_at = time.monotonic()
+            task = asyncio.ensure_future(job.factory())
+            # Abandon après le démarrage : annuler aussi le travail en cours
+            job.future.add_done_callback(
+                lambda future, task=task: task.cancel() if future.cancelled() else None
+            )
+            try:
+                result = await task
+                if not job.future.done():
+                    job.future.set_result(result)
+            except asyncio.CancelledError:
+                job.future.cancel()
+                # Seul l'arrêt du worker lui-même le fait sortir de la boucle
+                if asyncio.current_task().cancelling():
+                    task.cancel()
+                    raise
+            except Exception as e:
+                if not job.future.done():
+                    job.future.set_exception(e)
+            finally:
+                self.running -= 1
+                self.completed += 1
+                elapsed = time.monotonic() - started_at
+                self.avg_duration = 0.8 * self.avg_duration + 0.2 * elapsed
+
+    def stop(self):
+        """Arrêter les workers"""
+        for task in self._tasks:
+            task.cancel()
+        self._tasks = []
+
+    def stats(self) -> Dict:
+        """Obtenir les statistiques de l'ordonnanceur"""
+        return {
+            'workers': self.workers,
+            'running': self.running,
+            'queued': sum(len(heap) for heap in self._queues.values()),
+            'waiting_users': len(self._queues),
+            'completed': self.completed,
+            'avg_duration': self.avg_duration,
+        }
@@ -8,6 +8,7 @@ import sys
 from pathlib import Path
 from typing import Dict, List, Any, Optional
 import logging
+from pinterest_urls import PINTEREST_URL_PATTERN
 
 # ============================================================================
 # 1. CONFIGURATION DU BOT TELEGRAM
@@ -56,6 +57,16 @@ SUPPORTED_FORMATS: List[str] = ["mp4", "webm", "mkv"]
 # Extension par défaut pour les fichiers
 DEFAULT_EXTENSION: str = "mp4"
 
+# Envoyer les MP4 directs en flux (CDN → Telegram) sans fichier temporaire
+STREAMING_UPLOAD: bool = True
+
+# Taille des blocs transférés en mode flux (en bytes)
+STREAM_CHUNK_SIZE: int = 256 * 1024  # 256 KB
+
+# Téléchargement des MP4 directs sur plusieurs connexions (requêtes Range)
+RANGED_CONNECTIONS: int = 4                 # Plages téléchargées en parallèle
+RANGED_MIN_SIZE: int = 8 * 1024 * 1024      # En dessous : une seule connexion
+
 # ============================================================================
 # 3. CONFIGURATION DES DOSSIERS
 # ============================================================================
@@ -72,11 +83,19 @@ SUBDIRS: Dict[str, Path] = {
     "thumbnails": TEMP_DIR / "thumbnails",
     "logs": TEMP_DIR / "logs",
     "cache": TEMP_DIR / "cache",
+    "partial": TEMP_DIR / "partial",
 }
 
+# Base SQLite (historique, compteurs par utilisateur, index file_id et cache vidéo)
+DATABASE_PATH: Path = SUBDIRS["cache"] / "bot.db"
+
 # Durée de conservation des fichiers temporaires (en heures)
 TEMP_FILE_RETENTION_HOURS: int = 1
 
+# Téléchargements interrompus conservés pour reprise (hors nettoyage horaire)
+PARTIAL_RETENTION_HOURS: int = 24
+PARTIAL_CHECKPOINT_BYTES: int = 8 * 1024 * 1024  # Manifeste sauvegardé tous les 8 MB
+
 # ============================================================================
 # 4. CONFIGURATION DES LOGS
 # ============================================================================
@@ -94,19 +113,18 @@ LOG_FILE: Path = TEMP_DIR / "logs" / "bot.log"
 LOG_MAX_SIZE: int = 10 * 1024 * 1024  # 10 MB
 LOG_BACKUP_COUNT: int = 5
 
+# Métriques au format Prometheus (GET /metrics), accessibles en local uniquement
+METRICS_ENABLED: bool = True
+METRICS_HOST: str = "127.0.0.1"
+METRICS_PORT: int = 9108
+
 # ============================================================================
 # 5. CONFIGURATION PINTEREST
 # ============================================================================
 
 # URLs Pinterest supportées
-PINTEREST_URL_PATTERNS: List[str] = [
-    r'https?://(www\.)?pinterest\.(com|fr|de|es|it|co\.uk)/pin/\d+',
-    r'https?://(www\.)?pinterest\.(com|fr|de|es|it|co\.uk)/[^/]+/pin/\d+',
-    r'https?://pin\.it/[a-zA-Z0-9]+',
-    r'https?://pinterest\.com/pin/\d+',
-    r'https?://pinterest\.fr/pin/\d+',
-    r'pinterest://pin/\d+',
-]
+# Source unique : motif combiné défini dans pinterest_urls.py
+PINTEREST_URL_PATTERNS: List[str] = [PINTEREST_URL_PATTERN]
 
 # Headers pour les requêtes HTTP
 HTTP_HEADERS: Dict[str, str] = {
@@ -132,6 +150,17 @@ MAX_RETRIES: int = 3
 # Délai entre les tentatives (en secondes)
 RETRY_DELAY: int = 2
 
+# Pool de connexions HTTP partagé (pages Pinterest + CDN vidéo)
+HTTP_POOL_LIMIT: int = 100           # Connexions simultanées au total
+HTTP_POOL_LIMIT_PER_HOST: int = 16   # Connexions simultanées par hôte
+HTTP_KEEPALIVE_TIMEOUT: int = 60     # Durée de vie d'une connexion inactive (s)
+HTTP_DNS_CACHE_TTL: int = 300        # Durée du cache DNS (s)
+
+# Tailles des formats inconnues : requêtes HEAD parallèles (Content-Length)
+SIZE_PROBE_TIMEOUT: int = 3          # Délai maximum par requête HEAD (s)
+SIZE_PROBE_TTL: int = 3600           # Validité d'une taille sans expiration signée (s)
+SIZE_PROBE_MAX_ENTRIES: int = 10000  # Nombre maximum d'URLs mémorisées
+
 # ============================================================================
 # 6. CONFIGURATION yt-dlp
 # ============================================================================
@@ -267,9 +296,63 @@ MAX_CONCURRENT_DOWNLOADS: int = 1
 # Taux limite par utilisateur (téléchargements par heure)
 RATE_LIMIT_PER_HOUR: int = 10
 
+# Taux limite par utilisateur (liens analysés par minute)
+RATE_LIMIT_MESSAGES_PER_MINUTE: int = 20
+
+# Nombre maximum de téléchargements admis (en cours + en file), tous utilisateurs confondus
+MAX_GLOBAL_DOWNLOADS: int = 50
+
+# Nombre de téléchargements exécutés en parallèle par l'ordonnanceur
+DOWNLOAD_WORKERS: int = 4
+
+# En dessous de cette taille, un téléchargement passe devant les gros fichiers
+SMALL_JOB_SIZE: int = 10 * 1024 * 1024  # 10 MB
+
+# Intervalle de mise à jour de la position dans la file (en secondes)
+QUEUE_UPDATE_INTERVAL: int = 10
+
+# Attente maximale d'un créneau libre avant de refuser (en secondes)
+ADMISSION_MAX_WAIT: int = 5
+
 # Taille maximale du cache (en bytes)
 MAX_CACHE_SIZE: int = 100 * 1024 * 1024  # 100 MB
 
+# Pool de workers pour les appels bloquants yt-dlp (extraction + téléchargement)
+# "thread" (par défaut) ou "process" pour contourner le GIL
+WORKER_POOL_TYPE: str = "thread"
+
+# Nombre de workers exécutant yt-dlp en parallèle
+WORKER_POOL_SIZE: int = 8
+
+# Nombre de tâches pouvant attendre un worker libre (au-delà : rejet)
+WORKER_QUEUE_SIZE: int = 32
+
+# Durée de vie du cache des métadonnées de pins (en secondes)
+# Doit rester inférieure à la validité des URLs CDN signées qu'il contient
+METADATA_CACHE_TTL: int = 3600  # 1 heure
+
+# Nombre maximum de file_id Telegram mémorisés (pin + qualité déjà envoyés)
+FILE_ID_INDEX_MAX_ENTRIES: int = 100000
+
+# Cache disque des vidéos déjà téléchargées (pin + qualité), en bytes
+VIDEO_CACHE_MAX_SIZE: int = 2 * 1024 * 1024 * 1024  # 2 GB
+
+# Nombre maximum de correspondances pin + qualité -> vidéo en cache
+VIDEO_CACHE_MAX_ENTRIES: int = 100000
+
+# Écritures SQLite regroupées : taille maximale d'un lot et fenêtre de regroupement (s)
+DATABASE_BATCH_SIZE: int = 200
+DATABASE_COMMIT_INTERVAL: float = 0.5
+
+# Nombre maximum de liens courts pin.it résolus mémorisés
+SHORT_LINK_INDEX_MAX_ENTRIES: int = 100000
+
+# Durée de vie d'une session utilisateur (choix de qualité en attente, en secondes)
+SESSION_TTL: int = 1800  # 30 minutes
+
+# Nombre maximum de sessions utilisateurs conservées en mémoire
+SESSION_MAX_ENTRIES: int = 50000
+
 # ============================================================================
 # 9. CONFIGURATION DE SÉCURITÉ
 # ============================================================================
@@ -406,6 +489,8 @@ def load_env_file(env_file: str = ".env") -> None:
 
 # Charger automatiquement le fichier .env
 load_env_file()
+# Le token peut venir du fichier .env, chargé après sa première lecture
+TELEGRAM_TOKEN = os.getenv("TELEGRAM_TOKEN", TELEGRAM_TOKEN)
 
 # ============================================================================
 # 12. EXPORT DES CONFIGURATIONS UTILES
@@ -428,17 +513,27 @@ __all__ = [
     'DEFAULT_QUALITY',
     'SUPPORTED_FORMATS',
     'DEFAULT_EXTENSION',
+    'STREAMING_UPLOAD',
+    'STREAM_CHUNK_SIZE',
+    'RANGED_CONNECTIONS',
+    'RANGED_MIN_SIZE',
     
     # Dossiers
     'BASE_DIR',
     'TEMP_DIR',
     'SUBDIRS',
+    'DATABASE_PATH',
     'TEMP_FILE_RETENTION_HOURS',
+    'PARTIAL_RETENTION_HOURS',
+    'PARTIAL_CHECKPOINT_BYTES',
     
     # Logs
     'LOG_LEVEL',
     'LOG_FORMAT',
     'LOG_FILE',
+    'METRICS_ENABLED',
+    'METRICS_HOST',
+    'METRICS_PORT',
     
     # Pinterest
     'PINTEREST_URL_PATTERNS',
@@ -446,6 +541,13 @@ __all__ = [
     'HTTP_TIMEOUT',
     'MAX_RETRIES',
     'RETRY_DELAY',
+    'HTTP_POOL_LIMIT',
+    'HTTP_POOL_LIMIT_PER_HOST',
+    'HTTP_KEEPALIVE_TIMEOUT',
+    'HTTP_DNS_CACHE_TTL',
+    'SIZE_PROBE_TIMEOUT',
+    'SIZE_PROBE_TTL',
+    'SIZE_PROBE_MAX_ENTRIES',
     
     # yt-dlp
     'YTDLP_OPTIONS',
@@ -456,7 +558,25 @@ __all__ = [
     # Limites
     'MAX_CONCURRENT_DOWNLOADS',
     'RATE_LIMIT_PER_HOUR',
+    'RATE_LIMIT_MESSAGES_PER_MINUTE',
+    'MAX_GLOBAL_DOWNLOADS',
+    'ADMISSION_MAX_WAIT',
+    'DOWNLOAD_WORKERS',
+    'SMALL_JOB_SIZE',
+    'QUEUE_UPDATE_INTERVAL',
     'MAX_CACHE_SIZE',
+    'WORKER_POOL_TYPE',
+    'WORKER_POOL_SIZE',
+    'WORKER_QUEUE_SIZE',
+    'METADATA_CACHE_TTL',
+    'FILE_ID_INDEX_MAX_ENTRIES',
+    'VIDEO_CACHE_MAX_SIZE',
+    'VIDEO_CACHE_MAX_ENTRIES',
+    'DATABASE_BATCH_SIZE',
+    'DATABASE_COMMIT_INTERVAL',
+    'SHORT_LINK_INDEX_MAX_ENTRIES',
+    'SESSION_TTL',
+    'SESSION_MAX_ENTRIES',
     
     # Sécurité
     'ALLOW_EXTERNAL_SOURCES',
@@ -0,0 +1,258 @@
+"""
+Métriques du Pinterest Video Downloader Bot
+Compteurs, jauges et histogrammes au format texte Prometheus, servis en HTTP local
+"""
+
+import time
+import asyncio
+import contextlib
+from bisect import bisect_left
+from typing import Callable, Dict, Iterator, List, Optional, Sequence, Tuple
+
+# Bornes par défaut des histogrammes de durée (en secondes)
+DEFAULT_BUCKETS = (0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60, 120, 300)
+
+# Débits de téléchargement (en bytes/s) : de 100 KB/s à 100 MB/s
+THROUGHPUT_BUCKETS = tuple(kb * 1024 for kb in (100, 250, 500, 1000, 2500, 5000, 10000, 25000, 50000, 100000))
+
+
+class Registry:
+    """Ensemble des métriques exposées"""
+
+    def __init__(self):
+        self._metrics: List["Metric"] = []
+
+    def register(self, metric: "Metric"):
+        self._metrics.append(metric)
+
+    def render(self) -> str:
+        """Exporter toutes les métriques au format texte (version 0.0.4)"""
+        lines = []
+        for metric in self._metrics:
+            lines.append(f"# HELP {metric.name} {metric.documentation}")
+            lines.append(f"# TYPE {metric.name} {metric.kind}")
+            lines.extend(metric.samples())
+        return "\n".join(lines) + "\n"
+
+
+REGISTRY = Registry()
+
+
+def _format_labels(names: Sequence[str], values: Sequence[str], extra: str = "") -> str:
+    pairs = [f'{name}="{_escape(value)}"' for name, value in zip(names, values)]
+    if extra:
+        pairs.append(extra)
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+
+def _escape(value) -> str:
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _format_value(value: float) -> str:
+    if value == float('inf'):
+        return "+Inf"
+    return repr(float(value)) if isinstance(value, float) and not value.is_integer() else str(int(value))
+
+
+class Metric:
+    """Métrique nommée, avec ou sans étiquettes"""
+
+    kind = "untyped"
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = (),
+                 registry: Registry = REGISTRY):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        # valeurs d'étiquettes -> valeur (incrémentée sans verrou, coût d'un dict)
+        self._values: Dict[Tuple[str, ...], float] = {}
+        self._function: Optional[Callable[[], Dict[Tuple[str, ...], float]]] = None
+        registry.register(self)
+
+    def set_function(self, function: Callable[[], Dict[Tuple[str, ...], float]]):
+        """Calculer les valeurs au moment de l'export (ex. statistiques d'un cache)"""
+        self._function = function
+
+    def samples(self) -> Iterator[str]:
+        values = self._values
+        if self._function is not None:
+            try:
+                values = self._function()
+            except Exception as e:
+                print(f"⚠️ Erreur métrique {self.name}: {e}")
+                values = {}
+        for labelvalues, value in sorted(values.items()):
+            yield f"{self.name}{_format_labels(self.labelnames, labelvalues)} {_format_value(value)}"
+
+
+class Counter(Metric):
+    """Compteur croissant"""
+
+    kind = "counter"
+
+    def inc(self, *labelvalues: str, amount: float = 1):
+        self._values[labelvalues] = self._values.get(labelvalues, 0) + amount
+
+
+class Gauge(Metric):
+    """Valeur instantanée"""
+
+    kind = "gauge"
+
+    def set(self, value: float, *labelvalues: str):
+        self._values[labelvalues] = value
+
+
+class Histogram(Metric):
+    """Répartition d'observations par bornes cumulées, avec somme et nombre"""
+
+    kind = "histogram"
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = (),
+                 buckets: Sequence[float] = DEFAULT_BUCKETS, registry: Registry = REGISTRY):
+        super().__init__(name, documentation, labelnames, registry)
+        self.buckets = tuple(sorted(buckets))
+        # valeurs d'étiquettes -> [compte par borne (+Inf en dernier), somme]
+        self._series: Dict[Tuple[str, ...], list] = {}
+
+    def observe(self, value: float, *labelvalues: str):
+        series = self._series.get(labelvalues)
+        if series is None:
+            series = self._series[labelvalues] = [[0] * (len(self.buckets) + 1), 0.0]
+        series[0][bisect_left(self.buckets, value)] += 1
+        series[1] += value
+
+    @contextlib.contextmanager
+    def time(self, *labelvalues: str):
+        """Mesurer la durée d'un bloc"""
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(time.perf_counter() - started, *labelvalues)
+
+    def samples(self) -> Iterator[str]:
+        for labelvalues, (counts, total) in sorted(self._series.items()):
+            cumulative = 0
+            for bound, count in zip(self.buckets + (float('inf'),), counts):
+                cumulative += count
+                le = f'le="{_format_value(bound)}"'
+                yield f"{self.name}_bucket{_format_labels(self.labelnames, labelvalues, le)} {cumulative}"
+            labels = _format_labels(self.labelnames, labelvalues)
+            yield f"{self.name}_sum{labels} {_format_value(total)}"
+            yield f"{self.name}_count{labels} {cumulative}"
+
+
+# ============================================================================
+# Métriques du bot
+# ============================================================================
+
+EXTRACTION_SECONDS = Histogram(
+    "pinterest_extraction_seconds",
+    "Durée d'extraction des informations d'un pin, par méthode ayant abouti",
+    ("path",)
+)
+
+DOWNLOAD_SECONDS = Histogram(
+    "pinterest_download_seconds",
+    "Durée de téléchargement d'une vidéo, par méthode",
+    ("method",)
+)
+
+DOWNLOAD_BYTES = Counter(
+    "pinterest_download_bytes_total",
+    "Octets téléchargés, par méthode",
+    ("method",)
+)
+
+DOWNLOAD_THROUGHPUT = Histogram(
+    "pinterest_download_throughput_bytes_per_second",
+    "Débit de téléchargement d'une vidéo, par méthode",
+    ("method",),
+    buckets=THROUGHPUT_BUCKETS
+)
+
+UPLOAD_SECONDS = Histogram(
+    "pinterest_upload_seconds",
+    "Durée d'envoi à Telegram, par mode (file_id, flux, fichier, parties)",
+    ("mode",)
+)
+
+PROCESS_SECONDS = Histogram(
+    "pinterest_process_download_seconds",
+    "Durée totale d'une demande de téléchargement, du clic à l'envoi",
+    ("result",)
+)
+
+ERRORS = Counter(
+    "pinterest_errors_total",
+    "Erreurs par étape (extraction, download, upload, ffmpeg...)",
+    ("stage",)
+)
+
+FFMPEG_SECONDS = Histogram(
+    "pinterest_ffmpeg_seconds",
+    "Durée des processus ffmpeg/ffprobe, par opération",
+    ("operation",)
+)
+
+QUEUE_DEPTH = Gauge(
+    "pinterest_queue_depth",
+    "Téléchargements en attente et en cours dans l'ordonnanceur",
+    ("state",)
+)
+
+CACHE_LOOKUPS = Counter(
+    "pinterest_cache_lookups_total",
+    "Consultations des caches, par cache et résultat",
+    ("cache", "result")
+)
+
+
+# ============================================================================
+# Serveur HTTP
+# ============================================================================
+
+async def _handle(reader: asyncio.StreamReader, writer: asyncio.StreamWriter,
+                  registry: Registry):
+    try:
+        request = await asyncio.wait_for(reader.readline(), timeout=5)
+        # Ignorer les en-têtes de la requête
+        while (await asyncio.wait_for(reader.readline(), timeout=5)) not in (b"\r\n", b"\n", b""):
+            pass
+
+        parts = request.decode('latin-1').split()
+        if len(parts) >= 2 and parts[0] == "GET" and parts[1].split('?')[0] == "/metrics":
+            body = registry.render().encode('utf-8')
+            status = "200 OK"
+            content_type = "text/plain; version=0.0.4; charset=utf-8"
+        else:
+            body = b"Not Found\n"
+            status = "404 Not Found"
+            content_type = "text/plain; charset=utf-8"
+
+        writer.write(
+            f"HTTP/1.1 {status}\r\nContent-Type: {content_type}\r\n"
+            f"Content-Length: {len(body)}\r\nConnection: close\r\n\r\n".encode('latin-1') + body
+        )
+        await writer.drain()
+    except (asyncio.TimeoutError, ConnectionError):
+        pass
+    finally:
+        writer.close()
+
+
+async def start_server(host: str, port: int, registry: Registry = REGISTRY) -> asyncio.AbstractServer:
+    """
+    Servir GET /metrics sur host:port
+
+    Args:
+        host: Adresse d'écoute (127.0.0.1 pour un accès local uniquement)
+        port: Port d'écoute
+        registry: Métriques à exposer
+
+    Returns:
+        asyncio.AbstractServer: Serveur à fermer à l'arrêt du bot
+    """
+    return await asyncio.start_server(lambda r, w: _handle(r, w, registry), host, port)
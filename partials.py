@@ -0,0 +1,212 @@
+"""
+Téléchargements partiels du Pinterest Video Downloader Bot
+Fichiers .part et manifestes JSON conservés dans SUBDIRS["partial"] pour reprendre
+un téléchargement interrompu, y compris après un redémarrage
+"""
+
+import os
+import json
+import time
+import asyncio
+import hashlib
+import contextlib
+from pathlib import Path
+from typing import AsyncIterator, Dict, List, Optional
+from urllib.parse import urlparse
+
+from utils import Utils
+
+
+class PartialDownload:
+    """Fichier partiel et son manifeste (URL, ETag, plages et octets reçus)"""
+
+    def __init__(self, directory: Path, key: str, manifest: Dict, checkpoint_bytes: int):
+        self.data_path = directory / f"{key}.part"
+        self.manifest_path = directory / f"{key}.json"
+        self.manifest = manifest
+        self.checkpoint_bytes = checkpoint_bytes
+        self._unsaved = 0
+
+    @property
+    def total(self) -> int:
+        return self.manifest['total']
+
+    @property
+    def ranges(self) -> List[List[int]]:
+        """Plages [début, fin, octets reçus], modifiées sur place pendant le téléchargement"""
+        return self.manifest['ranges']
+
+    @property
+    def done(self) -> int:
+        return sum(done for start, end, done in self.ranges)
+
+    def pending(self) -> List[List[int]]:
+        """Plages encore incomplètes"""
+        return [entry for entry in self.ranges if entry[2] < entry[1] - entry[0] + 1]
+
+    def advance(self, entry: List[int], size: int) -> bool:
+        """
+        Comptabiliser des octets écrits dans une plage
+
+        Returns:
+            bool: True s'il est temps de sauvegarder le manifeste
+        """
+        entry[2] += size
+        self._unsaved += size
+        return self._unsaved >= self.checkpoint_bytes
+
+    async def checkpoint(self, fd: int):
+        """Forcer les données sur disque puis enregistrer l'avancement correspondant"""
+        ranges = [list(entry) for entry in self.ranges]
+        self._unsaved = 0
+        await asyncio.to_thread(os.fsync, fd)
+        self.save(ranges)
+
+    def save(self, ranges: Optional[List[List[int]]] = None):
+        """Écrire le manifeste (remplacement atomique)"""
+        manifest = dict(self.manifest, ranges=ranges or self.ranges, updated=time.time())
+        try:
+            tmp_path = self.manifest_path.with_suffix('.tmp')
+            with open(tmp_path, 'w', encoding='utf-8') as f:
+                json.dump(manifest, f)
+            os.replace(tmp_path, self.manifest_path)
+        except OSError as e:
+            print(f"⚠️ Erreur écriture manifeste {self.manifest_path.name}: {e}")
+
+    def complete(self, filename: str):
+        """Déplacer le fichier terminé vers sa destination et oublier le manifeste"""
+        os.replace(self.data_path, filename)
+        Utils.remove_file(self.manifest_path)
+
+    def discard(self):
+        """Abandonner le partiel (ressource modifiée ou données invalides)"""
+        Utils.remove_file(self.data_path)
+        Utils.remove_file(self.manifest_path)
+
+
+class PartialStore:
+    """Téléchargements partiels indexés par URL (sans paramètres de signature)"""
+
+    def __init__(self, directory: Path, retention_hours: int, checkpoint_bytes: int):
+        self.directory = Path(directory)
+        self.directory.mkdir(parents=True, exist_ok=True)
+        self.retention_hours = retention_hours
+        self.checkpoint_bytes = checkpoint_bytes
+
+        # clé -> [verrou, nombre de demandeurs]
+        self._claims: Dict[str, list] = {}
+
+        self.resumed = 0
+        self.bytes_resumed = 0
+        self.discarded = 0
+
+    @staticmethod
+    def key(url: str) -> str:
+        """Clé stable d'une URL : hôte + chemin (la signature change à chaque extraction)"""
+        parsed = urlparse(url)
+        return hashlib.sha1(f"{parsed.netloc}{parsed.path}".encode('utf-8')).hexdigest()
+
+    @contextlib.asynccontextmanager
+    async def claim(self, url: str) -> AsyncIterator[str]:
+        """Réserver le partiel d'une URL (un seul téléchargement à la fois)"""
+        key = self.key(url)
+        claim = self._claims.setdefault(key, [asyncio.Lock(), 0])
+        claim[1] += 1
+        try:
+            async with claim[0]:
+                yield key
+        finally:
+            claim[1] -= 1
+            if not claim[1]:
+                del self._claims[key]
+
+    def open(self, key: str, url: str, total: int, etag: Optional[str],
+             connections: int) -> PartialDownload:
+        """
+        Reprendre le partiel existant ou en créer un nouveau
+
+        Args:
+            key: Clé obtenue par claim()
+            url: URL du fichier
+            total: Taille totale annoncée par le serveur
+            etag: ETag annoncé par le serveur (None si absent)
+            connections: Nombre de plages d'un nouveau partiel
+
+        Returns:
+            PartialDownload: Partiel prêt à être complété
+        """
+        manifest = self._load(key)
+        partial = PartialDownload(self.directory, key, manifest or {}, self.checkpoint_bytes)
+
+        if manifest and self._matches(partial, total, etag):
+            if partial.done:
+                self.resumed += 1
+                self.bytes_resumed += partial.done
+                print(f"♻️ Reprise d'un téléchargement partiel ({partial.done}/{total} octets)")
+            partial.manifest['url'] = url
+            return partial
+
+        if manifest:
+            partial.discard()
+            self.discarded += 1
+
+        part_size = -(-total // max(1, connections))
+        partial.manifest = {
+            'url': url,
+            'etag': etag,
+            'total': total,
+            'ranges': [[start, min(start + part_size, total) - 1, 0]
+                       for start in range(0, total, part_size)],
+        }
+        partial.save()
+        return partial
+
+    def _load(self, key: str) -> Optional[Dict]:
+        try:
+            with open(self.directory / f"{key}.json", 'r', encoding='utf-8') as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return None
+
+    @staticmethod
+    def _matches(partial: PartialDownload, total: int, etag: Optional[str]) -> bool:
+        """Le partiel correspond-il toujours à la ressource distante ?"""
+        manifest = partial.manifest
+        if manifest.get('total') != total or not isinstance(manifest.get('ranges'), list):
+            return False
+        if etag and manifest.get('etag') and manifest['etag'] != etag:
+            return False
+        try:
+            return os.path.getsize(partial.data_path) == total
+        except OSError:
+            return False
+
+    def purge(self) -> int:
+        """
+        Supprimer les partiels abandonnés depuis plus de retention_hours
+
+        Returns:
+            int: Nombre de fichiers supprimés
+        """
+        active = set(self._claims)
+        limit = time.time() - self.retention_hours * 3600
+        removed = 0
+        for entry in os.scandir(self.directory):
+            if entry.name.split('.')[0] in active:
+                continue
+            try:
+                if entry.stat().st_mtime < limit:
+                    os.remove(entry.path)
+                    removed += 1
+            except OSError:
+                continue
+        return removed
+
+    def stats(self) -> Dict:
+        """Obtenir les statistiques des reprises"""
+        return {
+            'active': len(self._claims),
+            'resumed': self.resumed,
+            'bytes_resumed': self.bytes_resumed,
+            'discarded': self.discarded,
+        }
@@ -4,13 +4,98 @@ import aiohttp
 import json
 import os
 import time
-from urllib.parse import urlparse, urljoin
-from typing import Dict, List, Optional, Tuple
+import random
+from collections import OrderedDict
+from urllib.parse import parse_qs, urlparse, urljoin
+from typing import AsyncIterator, Dict, List, Optional, Tuple
 import yt_dlp
+import config
+import metrics
+from concurrency import WorkerPool, SingleFlight
+from cache import MetadataCache
+from partials import PartialDownload, PartialStore
+from pinterest_urls import is_pinterest_url, extract_pin_id, extract_short_code
+from utils import QUALITY_RUNGS
+
+# Nombre maximum de redirections suivies pour un lien court
+MAX_SHORT_LINK_REDIRECTS = 5
+
+# Paramètres d'URL signée portant la date d'expiration (timestamp Unix)
+SIGNED_EXPIRY_PARAMS = ('expires', 'Expires', 'x-expires')
+
+# Blocs JSON embarqués dans les pages Pinterest
+PAGE_JSON_PATTERN = re.compile(
+    r'<script[^>]*id="(?:__PWS_DATA__|initial-state)"[^>]*>(.*?)</script>',
+    re.DOTALL
+)
+
+# Écritures disque d'un téléchargement regroupées par blocs de cette taille (hors boucle asyncio)
+DOWNLOAD_WRITE_BUFFER = 1024 * 1024
+
+async def _run_in_thread(func, *args):
+    """
+    asyncio.to_thread dont l'annulation attend la fin de l'appel
+    
+    Le descripteur passé à os.pwrite / os.fsync ne doit pas être fermé (puis
+    réattribué) pendant que le thread l'utilise encore.
+    """
+    future = asyncio.ensure_future(asyncio.to_thread(func, *args))
+    try:
+        return await asyncio.shield(future)
+    except asyncio.CancelledError:
+        while not future.done():
+            try:
+                await asyncio.wait({future})
+            except asyncio.CancelledError:
+                continue
+        raise
+
+def _ytdlp_extract(ydl_opts: Dict, url: str, download: bool) -> Optional[Dict]:
+    """Appel bloquant à yt-dlp, exécuté dans le pool de workers"""
+    with yt_dlp.YoutubeDL(ydl_opts) as ydl:
+        info = ydl.extract_info(url, download=download)
+        # sanitize_info rend le résultat picklable (mode "process")
+        return ydl.sanitize_info(info) if info else None
 
 class PinterestDownloader:
-    def __init__(self):
+    def __init__(self, short_links):
+        """
+        Args:
+            short_links: Index code pin.it -> ID de pin (get/put/stats)
+        """
         self.session = None
+        self.pool = WorkerPool(
+            config.WORKER_POOL_SIZE,
+            config.WORKER_QUEUE_SIZE,
+            config.WORKER_POOL_TYPE
+        )
+        self.metadata_cache = MetadataCache(
+            config.SUBDIRS["cache"],
+            config.METADATA_CACHE_TTL,
+            config.MAX_CACHE_SIZE
+        )
+        self.short_links = short_links
+        self.partials = PartialStore(
+            config.SUBDIRS["partial"],
+            config.PARTIAL_RETENTION_HOURS,
+            config.PARTIAL_CHECKPOINT_BYTES
+        )
+        self.inflight = SingleFlight()
+        # URL de format -> (expiration, taille), ordre LRU
+        self.size_cache: "OrderedDict[str, Tuple[float, int]]" = OrderedDict()
+        self.size_probe_stats = {'hits': 0, 'misses': 0, 'errors': 0}
+        self.download_stats = {'ranged': 0, 'single': 0, 'ytdlp': 0, 'direct_failures': 0}
+        self.path_stats = {
+            'fast': {'hits': 0, 'misses': 0},
+            'ytdlp': {'hits': 0, 'misses': 0},
+            'fallback': {'hits': 0, 'misses': 0},
+        }
+        self.http_stats = {
+            'connections_created': 0,
+            'connections_reused': 0,
+            'dns_cache_hits': 0,
+            'dns_cache_misses': 0,
+        }
         self.headers = {
             'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36',
             'Accept': 'text/html,application/xhtml+xml,application/xml;q=0.9,image/webp,*/*;q=0.8',
@@ -27,29 +112,7 @@ class PinterestDownloader:
         
     def is_pinterest_url(self, url: str) -> bool:
         """Vérifier si l'URL est un lien Pinterest valide"""
-        url_patterns = [
-            r'https?://(www\.)?pinterest\.(com|fr|de|es|it|co\.uk)/pin/\d+',
-            r'https?://(www\.)?pinterest\.(com|fr|de|es|it|co\.uk)/[^/]+/pin/\d+',
-            r'https?://pin\.it/[a-zA-Z0-9]+',
-            r'https?://pinterest\.com/pin/\d+',
-            r'https?://pinterest\.fr/pin/\d+',
-            r'https?://pinterest\.de/pin/\d+',
-            r'https?://pinterest\.es/pin/\d+',
-            r'https?://pinterest\.it/pin/\d+',
-            r'pinterest://pin/\d+',
-            r'https?://(www\.)?pinterest\.(com|fr|de|es|it|co\.uk)/pin/\d+/',
-        ]
-        
-        # Vérifier chaque pattern
-        for pattern in url_patterns:
-            if re.match(pattern, url.strip()):
-                return True
-        
-        # Vérifier les URLs raccourcies
-        if 'pin.it' in url.lower():
-            return True
-            
-        return False
+        return is_pinterest_url(url)
     
     def normalize_pinterest_url(self, url: str) -> str:
         """Normaliser l'URL Pinterest"""
@@ -75,12 +138,371 @@ class PinterestDownloader:
         
         return clean_url
     
+    def get_pin_id(self, url: str) -> Optional[str]:
+        """Obtenir l'ID numérique du pin"""
+        return extract_pin_id(url)
+    
+    async def resolve_short_link(self, url: str) -> Optional[str]:
+        """Résoudre un lien pin.it en ID de pin (requêtes HEAD, sans corps)"""
+        code = extract_short_code(url)
+        if not code:
+            return None
+        
+        pin_id = self.short_links.get(code)
+        if pin_id:
+            return pin_id
+        
+        session = self.get_session()
+        timeout = aiohttp.ClientTimeout(total=config.HTTP_TIMEOUT)
+        current = f"https://pin.it/{code}"
+        method = 'HEAD'
+        
+        try:
+            for _ in range(MAX_SHORT_LINK_REDIRECTS):
+                # Seuls les en-têtes sont lus, le corps n'est jamais téléchargé
+                async with session.request(method, current, allow_redirects=False,
+                                           timeout=timeout) as response:
+                    status = response.status
+                    location = response.headers.get('Location')
+                
+                if status == 405 and method == 'HEAD':
+                    method = 'GET'
+                    continue
+                
+                if not location:
+                    return None
+                
+                current = urljoin(current, location)
+                pin_id = extract_pin_id(current)
+                if pin_id:
+                    self.short_links.put(code, pin_id)
+                    return pin_id
+        except Exception as e:
+            print(f"Error resolving short link {code}: {e}")
+        
+        return None
+    
+    async def get_video_info(self, url: str) -> Optional[Dict]:
+        """Obtenir les informations vidéo, depuis le cache si possible"""
+        pin_id = self.get_pin_id(url)
+        
+        # Lien court : résoudre vers l'URL canonique du pin
+        if not pin_id:
+            pin_id = await self.resolve_short_link(url)
+            if pin_id:
+                url = f"https://www.pinterest.com/pin/{pin_id}/"
+        
+        if pin_id:
+            cached = self.metadata_cache.get(pin_id)
+            if cached:
+                return cached
+        
+        # Une seule extraction pour tous les utilisateurs envoyant le même pin
+        key = ('info', pin_id or self.normalize_pinterest_url(url))
+        video_info = await self.inflight.run(key, lambda: self._extract_and_cache(url, pin_id))
+        
+        return dict(video_info) if video_info else None
+    
+    async def _extract_and_cache(self, url: str, pin_id: Optional[str]) -> Optional[Dict]:
+        """Extraire les informations et les mettre en cache"""
+        video_info = await self.extract_video_info(url)
+        
+        # Tailles inconnues : sonder les formats avant de présenter le menu
+        if video_info and await self.probe_sizes(video_info.get('qualities', [])):
+            self._finalize_video_info(video_info, video_info['qualities'])
+        
+        if video_info and pin_id:
+            video_info['pin_id'] = pin_id
+            self.metadata_cache.put(pin_id, video_info)
+        
+        return video_info
+    
+    async def probe_sizes(self, qualities: List[Dict]) -> int:
+        """
+        Compléter les tailles inconnues par des requêtes HEAD en parallèle
+        
+        Args:
+            qualities: Qualités extraites (modifiées sur place)
+            
+        Returns:
+            int: Nombre de tailles complétées
+        """
+        pending = [q for q in qualities
+                   if not q.get('filesize') and q.get('url') and q.get('extension') != 'm3u8']
+        if not pending:
+            return 0
+        
+        sizes = await asyncio.gather(*(self.probe_size(q['url']) for q in pending))
+        
+        updated = 0
+        for quality, size in zip(pending, sizes):
+            if size:
+                quality['filesize'] = size
+                quality['size'] = self.format_size(size)
+                updated += 1
+        return updated
+    
+    async def probe_size(self, url: str) -> int:
+        """
+        Obtenir la taille d'un format via Content-Length (mémorisée par URL)
+        
+        Args:
+            url: URL directe du format
+            
+        Returns:
+            int: Taille en octets, 0 si inconnue
+        """
+        now = time.time()
+        entry = self.size_cache.get(url)
+        if entry and entry[0] > now:
+            self.size_cache.move_to_end(url)
+            self.size_probe_stats['hits'] += 1
+            return entry[1]
+        
+        self.size_probe_stats['misses'] += 1
+        try:
+            session = self.get_session()
+            timeout = aiohttp.ClientTimeout(total=config.SIZE_PROBE_TIMEOUT)
+            async with session.head(url, timeout=timeout, allow_redirects=True) as response:
+                size = response.content_length if response.status == 200 else None
+        except (aiohttp.ClientError, asyncio.TimeoutError):
+            self.size_probe_stats['errors'] += 1
+            return 0
+        
+        if not size:
+            return 0
+        
+        self.size_cache[url] = (self._url_expiry(url, now), size)
+        self.size_cache.move_to_end(url)
+        while len(self.size_cache) > config.SIZE_PROBE_MAX_ENTRIES:
+            self.size_cache.popitem(last=False)
+        return size
+    
+    @staticmethod
+    def _url_expiry(url: str, now: float) -> float:
+        """Date d'expiration d'une URL signée, bornée par SIZE_PROBE_TTL"""
+        params = parse_qs(urlparse(url).query)
+        for name in SIGNED_EXPIRY_PARAMS:
+            value = params.get(name, [''])[0]
+            if value.isdigit():
+                return min(float(value), now + config.SIZE_PROBE_TTL)
+        return now + config.SIZE_PROBE_TTL
+    
     async def extract_video_info(self, url: str) -> Optional[Dict]:
         """Extraire les informations de la vidéo Pinterest"""
+        started = time.perf_counter()
+        video_info, path = await self._extract_by_path(url)
+        
+        metrics.EXTRACTION_SECONDS.observe(time.perf_counter() - started, path)
+        if not video_info:
+            metrics.ERRORS.inc('extraction')
+        return video_info
+    
+    async def _extract_by_path(self, url: str) -> Tuple[Optional[Dict], str]:
+        """Essayer chaque méthode d'extraction, retourne (infos, méthode ayant abouti)"""
+        # Normaliser l'URL
+        clean_url = self.normalize_pinterest_url(url)
+        
+        # 1. Chemin rapide : JSON embarqué dans la page, sans yt-dlp
+        video_info = await self.extract_video_info_fast(clean_url)
+        self._record_path('fast', video_info)
+        if video_info:
+            return video_info, 'fast'
+        
+        # 2. yt-dlp, pour les pins que le chemin rapide ne sait pas lire
+        video_info = await self.extract_video_info_ytdlp(clean_url)
+        self._record_path('ytdlp', video_info)
+        if video_info:
+            return video_info, 'ytdlp'
+        
+        # 3. Recherche d'URLs MP4 dans le HTML
+        try:
+            video_info = await self.extract_video_info_fallback(clean_url)
+        except Exception as e:
+            print(f"Fallback also failed: {e}")
+            video_info = None
+        self._record_path('fallback', video_info)
+        return video_info, 'fallback' if video_info else 'none'
+    
+    def _record_path(self, path: str, video_info: Optional[Dict]):
+        """Comptabiliser le succès ou l'échec d'une méthode d'extraction"""
+        self.path_stats[path]['hits' if video_info else 'misses'] += 1
+    
+    async def extract_video_info_fast(self, url: str) -> Optional[Dict]:
+        """Extraction native depuis le JSON __PWS_DATA__ / initial-state de la page"""
+        # Sans ID, impossible de distinguer le pin demandé des pins liés : yt-dlp
+        pin_id = self.get_pin_id(url)
+        if not pin_id:
+            return None
+        
         try:
-            # Normaliser l'URL
-            clean_url = self.normalize_pinterest_url(url)
+            session = self.get_session()
+            timeout = aiohttp.ClientTimeout(total=config.HTTP_TIMEOUT)
             
+            async with session.get(url, timeout=timeout) as response:
+                if response.status != 200:
+                    return None
+                html = await response.text()
+            
+            # Parser chaque bloc JSON une seule fois
+            pin, video_list = None, None
+            for match in PAGE_JSON_PATTERN.finditer(html):
+                try:
+                    data = json.loads(match.group(1))
+                except ValueError:
+                    continue
+                pin, video_list = self._find_video_list(data, pin_id)
+                if video_list:
+                    break
+            
+            if not video_list:
+                return None
+            
+            pin = pin or {}
+            duration_ms = 0
+            quality_map = {}
+            
+            for format_id, fmt in video_list.items():
+                if not isinstance(fmt, dict) or not fmt.get('url'):
+                    continue
+                
+                height = fmt.get('height') or 0
+                quality_name = self.get_quality_name(height, {'format_id': format_id})
+                is_hls = '.m3u8' in fmt['url']
+                duration_ms = duration_ms or fmt.get('duration') or 0
+                
+                quality_entry = {
+                    'format_id': format_id,
+                    'quality': quality_name,
+                    'height': height,
+                    'width': fmt.get('width') or 0,
+                    'fps': 0,
+                    'url': fmt['url'],
+                    'filesize': 0,
+                    'size': self.format_size(0),
+                    'extension': 'm3u8' if is_hls else 'mp4',
+                    'has_audio': True,
+                    'vcodec': 'unknown',
+                    'acodec': 'unknown'
+                }
+                
+                # Un MP4 direct est préféré au flux HLS de même résolution
+                current = quality_map.get(quality_name)
+                if current is None or (current['extension'] == 'm3u8' and not is_hls):
+                    quality_map[quality_name] = quality_entry
+            
+            if not quality_map:
+                return None
+            
+            images = pin.get('images') or {}
+            thumbnail = (images.get('orig') or {}).get('url', '') if isinstance(images, dict) else ''
+            
+            video_info = {
+                'title': pin.get('title') or pin.get('grid_title') or 'Pinterest Video',
+                'duration': self.format_duration(int(duration_ms / 1000)),
+                'thumbnail': thumbnail,
+                'uploader': (pin.get('pinner') or {}).get('full_name', 'Unknown'),
+                'description': (pin.get('description') or '')[:300],
+                'view_count': 0,
+                'like_count': 0,
+                'url': url,
+                'webpage_url': url,
+                'formats': [],
+                'qualities': []
+            }
+            
+            return self._finalize_video_info(video_info, list(quality_map.values()))
+            
+        except Exception as e:
+            print(f"Error in fast extractor: {e}")
+            return None
+    
+    def _find_video_list(self, data, pin_id: str) -> Tuple[Optional[Dict], Optional[Dict]]:
+        """
+        Parcourir le JSON de la page à la recherche du video_list du pin demandé
+        
+        La page embarque aussi les pins liés et recommandés : seul un video_list
+        situé sous l'objet dont l'id (ou pin.id) vaut pin_id est accepté.
+        """
+        stack = [(data, None, False)]
+        
+        while stack:
+            node, pin, owned = stack.pop()
+            
+            if isinstance(node, dict):
+                # Un objet pin porte ses vidéos dans "videos" ou "story_pin_data"
+                node_id = self._node_pin_id(node)
+                if 'videos' in node or 'story_pin_data' in node or node_id == pin_id:
+                    pin = node
+                    owned = node_id == pin_id
+                
+                video_list = node.get('video_list')
+                if owned and isinstance(video_list, dict) and video_list:
+                    return pin, video_list
+                
+                stack.extend((value, pin, owned) for value in node.values()
+                             if isinstance(value, (dict, list)))
+            elif isinstance(node, list):
+                stack.extend((value, pin, owned) for value in node
+                             if isinstance(value, (dict, list)))
+        
+        return None, None
+    
+    @staticmethod
+    def _node_pin_id(node: Dict) -> Optional[str]:
+        """ID du pin décrit par un objet JSON (champ id, ou pin.id)"""
+        node_id = node.get('id')
+        if node_id is None and isinstance(node.get('pin'), dict):
+            node_id = node['pin'].get('id')
+        return str(node_id) if node_id is not None else None
+    
+    def select_fitting_quality(self, qualities: List[Dict],
+                               max_size: Optional[int] = None) -> Optional[Dict]:
+        """
+        Choisir la qualité de plus haute résolution qui tient dans la limite
+        
+        Args:
+            qualities: Qualités disponibles
+            max_size: Taille maximum en octets (défaut MAX_FILE_SIZE)
+            
+        Returns:
+            Optional[Dict]: Qualité retenue, None si aucune taille connue ne tient
+        """
+        max_size = max_size or config.MAX_FILE_SIZE
+        fitting = [q for q in qualities if 0 < (q.get('filesize') or 0) <= max_size]
+        return max(fitting, key=lambda q: q.get('height', 0), default=None)
+    
+    def _finalize_video_info(self, video_info: Dict, qualities: List[Dict]) -> Dict:
+        """Trier les qualités et ajouter les informations de résumé"""
+        # Tient dans la limite Telegram : True/False, None si taille inconnue
+        for quality in qualities:
+            filesize = quality.get('filesize') or 0
+            quality['fits'] = filesize <= config.MAX_FILE_SIZE if filesize else None
+        
+        # Convertir en liste et trier par qualité
+        qualities.sort(key=lambda x: x['height'], reverse=True)
+        
+        # Limiter à 5 qualités maximum, en gardant toujours la meilleure qui tient
+        kept = qualities[:5]
+        best_fitting = self.select_fitting_quality(qualities)
+        if best_fitting is not None and best_fitting not in kept:
+            kept[-1] = best_fitting
+        video_info['qualities'] = kept
+        
+        # Ajouter les informations de résumé
+        if qualities:
+            best = qualities[0]
+            video_info['resolution'] = f"{best['width']}x{best['height']}" if best['width'] else f"{best['height']}p"
+            video_info['best_quality'] = best['quality']
+            video_info['best_size'] = best['size']
+            video_info['has_audio'] = best['has_audio']
+            video_info['format'] = best['extension'].upper()
+        
+        return video_info
+    
+    async def extract_video_info_ytdlp(self, clean_url: str) -> Optional[Dict]:
+        """Extraire les informations de la vidéo avec yt-dlp"""
+        try:
             # Options yt-dlp
             ydl_opts = {
                 'quiet': True,
@@ -93,111 +515,86 @@ class PinterestDownloader:
                 'http_headers': self.headers,
             }
             
-            video_info = None
+            # Extraire les informations dans le pool de workers
+            info = await self.pool.run(_ytdlp_extract, ydl_opts, clean_url, False)
             
-            with yt_dlp.YoutubeDL(ydl_opts) as ydl:
-                # Extraire les informations
-                info = ydl.extract_info(clean_url, download=False)
-                
-                if not info:
-                    # Essayer une autre méthode
-                    return await self.extract_video_info_fallback(clean_url)
-                
-                # Formater les informations
-                video_info = {
-                    'title': info.get('title', 'Pinterest Video'),
-                    'duration': self.format_duration(info.get('duration', 0)),
-                    'thumbnail': info.get('thumbnail', ''),
-                    'uploader': info.get('uploader', 'Unknown'),
-                    'description': info.get('description', '')[:300],
-                    'view_count': info.get('view_count', 0),
-                    'like_count': info.get('like_count', 0),
-                    'url': clean_url,
-                    'webpage_url': info.get('webpage_url', clean_url),
-                    'formats': [],
-                    'qualities': []
-                }
-                
-                # Extraire les formats disponibles
-                formats = info.get('formats', [])
-                
-                if not formats:
-                    # Si pas de formats, essayer avec une autre méthode
-                    return await self.extract_video_info_fallback(clean_url)
-                
-                # Organiser les formats par qualité
-                quality_map = {}
-                
-                for fmt in formats:
-                    if fmt.get('vcodec') == 'none':
-                        continue  # Ignorer les formats audio seulement
-                    
-                    # Déterminer la qualité
-                    height = fmt.get('height', 0)
-                    quality_name = self.get_quality_name(height, fmt)
-                    
-                    # Calculer la taille approximative
-                    filesize = fmt.get('filesize', fmt.get('filesize_approx', 0))
-                    
-                    # Déterminer l'extension
-                    ext = fmt.get('ext', 'mp4')
-                    if ext == 'unknown_video':
-                        ext = 'mp4'
-                    
-                    # Créer l'entrée qualité
-                    quality_entry = {
-                        'format_id': fmt.get('format_id', ''),
-                        'quality': quality_name,
-                        'height': height,
-                        'width': fmt.get('width', 0),
-                        'fps': fmt.get('fps', 0),
-                        'url': fmt.get('url', ''),
-                        'filesize': filesize,
-                        'size': self.format_size(filesize),
-                        'extension': ext,
-                        'has_audio': fmt.get('acodec') != 'none',
-                        'vcodec': fmt.get('vcodec', 'unknown'),
-                        'acodec': fmt.get('acodec', 'none')
-                    }
-                    
-                    # Garder la meilleure qualité pour chaque résolution
-                    if quality_name not in quality_map or filesize > quality_map[quality_name]['filesize']:
-                        quality_map[quality_name] = quality_entry
+            if not info:
+                return None
+            
+            # Formater les informations
+            video_info = {
+                'title': info.get('title', 'Pinterest Video'),
+                'duration': self.format_duration(info.get('duration', 0)),
+                'thumbnail': info.get('thumbnail', ''),
+                'uploader': info.get('uploader', 'Unknown'),
+                'description': info.get('description', '')[:300],
+                'view_count': info.get('view_count', 0),
+                'like_count': info.get('like_count', 0),
+                'url': clean_url,
+                'webpage_url': info.get('webpage_url', clean_url),
+                'formats': [],
+                'qualities': []
+            }
+            
+            # Extraire les formats disponibles
+            formats = info.get('formats', [])
+            
+            if not formats:
+                return None
+            
+            # Organiser les formats par qualité
+            quality_map = {}
+            
+            for fmt in formats:
+                if fmt.get('vcodec') == 'none':
+                    continue  # Ignorer les formats audio seulement
                 
-                # Convertir en liste et trier par qualité
-                qualities = list(quality_map.values())
-                qualities.sort(key=lambda x: x['height'], reverse=True)
+                # Déterminer la qualité
+                height = fmt.get('height', 0)
+                quality_name = self.get_quality_name(height, fmt)
                 
-                # Limiter à 5 qualités maximum
-                video_info['qualities'] = qualities[:5]
+                # Calculer la taille approximative (débit total x durée à défaut)
+                filesize = fmt.get('filesize') or fmt.get('filesize_approx') or 0
+                if not filesize and fmt.get('tbr') and info.get('duration'):
+                    filesize = int(fmt['tbr'] * 1000 / 8 * info['duration'])
                 
-                # Ajouter les informations de résumé
-                if qualities:
-                    best = qualities[0]
-                    video_info['resolution'] = f"{best['width']}x{best['height']}" if best['width'] else f"{best['height']}p"
-                    video_info['best_quality'] = best['quality']
-                    video_info['best_size'] = best['size']
-                    video_info['has_audio'] = best['has_audio']
-                    video_info['format'] = best['extension'].upper()
+                # Déterminer l'extension
+                ext = fmt.get('ext', 'mp4')
+                if ext == 'unknown_video':
+                    ext = 'mp4'
                 
-                return video_info
+                # Créer l'entrée qualité
+                quality_entry = {
+                    'format_id': fmt.get('format_id', ''),
+                    'quality': quality_name,
+                    'height': height,
+                    'width': fmt.get('width', 0),
+                    'fps': fmt.get('fps', 0),
+                    'url': fmt.get('url', ''),
+                    'filesize': filesize,
+                    'size': self.format_size(filesize),
+                    'extension': ext,
+                    'has_audio': fmt.get('acodec') != 'none',
+                    'vcodec': fmt.get('vcodec', 'unknown'),
+                    'acodec': fmt.get('acodec', 'none')
+                }
                 
+                # Garder la meilleure qualité pour chaque résolution
+                if quality_name not in quality_map or filesize > quality_map[quality_name]['filesize']:
+                    quality_map[quality_name] = quality_entry
+            
+            return self._finalize_video_info(video_info, list(quality_map.values()))
+            
         except Exception as e:
             print(f"Error in extract_video_info: {e}")
-            # Essayer la méthode fallback
-            try:
-                return await self.extract_video_info_fallback(url)
-            except Exception as e2:
-                print(f"Fallback also failed: {e2}")
-                return None
+            return None
     
     async def extract_video_info_fallback(self, url: str) -> Optional[Dict]:
         """Méthode fallback pour extraire les infos vidéo"""
         try:
-            if not self.session:
-                self.session = aiohttp.ClientSession(headers=self.headers)
+            session = self.get_session()
             
-            async with self.session.get(url, timeout=30) as response:
+            async with session.get(url, timeout=30) as response:
                 if response.status != 200:
                     return None
                 
@@ -282,6 +679,24 @@ class PinterestDownloader:
             timestamp = int(time.time())
             filename = f"temp/pinterest_{user_id}_{timestamp}.mp4"
             
+            # MP4 direct : téléchargement natif, yt-dlp en dernier recours
+            if self.is_direct_video_url(video_url):
+                try:
+                    filesize = await self.download_direct(video_url, filename)
+                    return {
+                        'file_path': filename,
+                        'size': filesize,
+                        'title': 'video',
+                        'duration': 0,
+                        'resolution': '',
+                        'format': 'mp4',
+                        'success': True
+                    }
+                except (aiohttp.ClientError, asyncio.TimeoutError, ValueError, OSError) as e:
+                    self.download_stats['direct_failures'] += 1
+                    metrics.ERRORS.inc('download_direct')
+                    print(f"⚠️ Téléchargement direct échoué, passage par yt-dlp: {e}")
+            
             # Options yt-dlp
             ydl_opts = {
                 'outtmpl': filename,
@@ -296,47 +711,258 @@ class PinterestDownloader:
                 'skip_unavailable_fragments': True,
                 'ignoreerrors': True,
                 'no_check_certificate': True,
-                'progress_hooks': [self.download_progress_hook],
             }
             
+            # Le hook (méthode liée) n'est pas picklable en mode "process"
+            if self.pool.kind != "process":
+                ydl_opts['progress_hooks'] = [self.download_progress_hook]
+            
             # Si une qualité spécifique est demandée
             if quality != "best":
                 # Chercher le format_id correspondant
                 ydl_opts['format'] = quality
             
-            with yt_dlp.YoutubeDL(ydl_opts) as ydl:
-                # Télécharger la vidéo
-                info = ydl.extract_info(video_url, download=True)
-                
-                if not info:
+            # Télécharger la vidéo dans le pool de workers
+            self.download_stats['ytdlp'] += 1
+            started = time.perf_counter()
+            info = await self.pool.run(_ytdlp_extract, ydl_opts, video_url, True)
+            
+            if not info:
+                metrics.ERRORS.inc('download')
+                return None
+            
+            # Vérifier si le fichier existe
+            if not os.path.exists(filename):
+                # Essayer avec l'extension .webm
+                webm_filename = filename.replace('.mp4', '.webm')
+                if os.path.exists(webm_filename):
+                    filename = webm_filename
+                else:
+                    metrics.ERRORS.inc('download')
                     return None
-                
-                # Vérifier si le fichier existe
-                if not os.path.exists(filename):
-                    # Essayer avec l'extension .webm
-                    webm_filename = filename.replace('.mp4', '.webm')
-                    if os.path.exists(webm_filename):
-                        filename = webm_filename
-                    else:
-                        return None
-                
-                # Obtenir les informations du fichier
-                filesize = os.path.getsize(filename)
-                
-                return {
-                    'file_path': filename,
-                    'size': filesize,
-                    'title': info.get('title', 'video'),
-                    'duration': info.get('duration', 0),
-                    'resolution': f"{info.get('width', 0)}x{info.get('height', 0)}",
-                    'format': info.get('ext', 'mp4'),
-                    'success': True
-                }
+            
+            # Obtenir les informations du fichier
+            filesize = os.path.getsize(filename)
+            self._observe_download('ytdlp', started, filesize)
+            
+            return {
+                'file_path': filename,
+                'size': filesize,
+                'title': info.get('title', 'video'),
+                'duration': info.get('duration', 0),
+                'resolution': f"{info.get('width', 0)}x{info.get('height', 0)}",
+                'format': info.get('ext', 'mp4'),
+                'success': True
+            }
                 
         except Exception as e:
             print(f"Download error: {e}")
+            metrics.ERRORS.inc('download')
             return None
     
+    def _observe_download(self, method: str, started: float, size: int):
+        """Mesurer durée, volume et débit d'un téléchargement"""
+        elapsed = time.perf_counter() - started
+        metrics.DOWNLOAD_SECONDS.observe(elapsed, method)
+        metrics.DOWNLOAD_BYTES.inc(method, amount=size)
+        if elapsed > 0:
+            metrics.DOWNLOAD_THROUGHPUT.observe(size / elapsed, method)
+    
+    async def download_direct(self, video_url: str, filename: str) -> int:
+        """
+        Télécharger un MP4 direct sur plusieurs connexions, avec reprise
+        
+        Le fichier partiel est préalloué puis chaque plage d'octets est écrite
+        à sa position avec os.pwrite. L'avancement est enregistré dans un
+        manifeste : une nouvelle tentative, une nouvelle demande ou un
+        redémarrage du bot reprend là où le téléchargement s'était arrêté.
+        Si le serveur ignore les requêtes Range, le fichier est lu en un seul flux.
+        
+        Args:
+            video_url: URL directe du fichier MP4
+            filename: Chemin du fichier de destination
+            
+        Returns:
+            int: Taille du fichier téléchargé
+        """
+        started = time.perf_counter()
+        total, ranged, etag = await self._probe_ranges(video_url)
+        if not ranged or total < config.RANGED_MIN_SIZE or not hasattr(os, 'pwrite'):
+            self.download_stats['single'] += 1
+            # Taille annoncée par la sonde : un corps tronqué est détecté
+            size = await self._download_single(video_url, filename, total)
+            self._observe_download('single', started, size)
+            return size
+        
+        async with self.partials.claim(video_url) as key:
+            partial = self.partials.open(key, video_url, total, etag, config.RANGED_CONNECTIONS)
+            resumed = partial.done
+            
+            for attempt in range(1, config.MAX_RETRIES + 1):
+                try:
+                    await self._download_ranges(video_url, partial, etag)
+                    break
+                except ValueError:
+                    # Ressource modifiée ou réponse incohérente : repartir de zéro
+                    partial.discard()
+                    raise
+                except (aiohttp.ClientError, asyncio.TimeoutError) as e:
+                    if attempt == config.MAX_RETRIES:
+                        raise
+                    print(f"🔁 Reprise du téléchargement ({partial.done}/{total} octets): {e}")
+                    await asyncio.sleep(config.RETRY_DELAY)
+            
+            partial.complete(filename)
+        
+        self.download_stats['ranged'] += 1
+        # Débit calculé sur les seuls octets reçus (hors reprise)
+        self._observe_download('ranged', started, total - resumed)
+        return total
+    
+    async def _probe_ranges(self, video_url: str) -> Tuple[int, bool, Optional[str]]:
+        """Taille totale, support des requêtes Range (GET bytes=0-0) et ETag"""
+        session = self.get_session()
+        timeout = aiohttp.ClientTimeout(total=config.HTTP_TIMEOUT)
+        headers = {'Range': 'bytes=0-0', 'Accept-Encoding': 'identity'}
+        
+        async with session.get(video_url, headers=headers, timeout=timeout) as response:
+            response.raise_for_status()
+            etag = response.headers.get('ETag')
+            if response.status == 206:
+                total = response.headers.get('Content-Range', '').rpartition('/')[2]
+                if total.isdigit():
+                    return int(total), True, etag
+            return response.content_length or 0, False, etag
+    
+    async def _download_ranges(self, video_url: str, partial: PartialDownload, etag: Optional[str]):
+        """Compléter en parallèle les plages manquantes du fichier partiel"""
+        fd = os.open(partial.data_path, os.O_WRONLY | os.O_CREAT, 0o644)
+        tasks = []
+        try:
+            if os.fstat(fd).st_size != partial.total:
+                await _run_in_thread(os.ftruncate, fd, partial.total)
+            tasks = [asyncio.create_task(self._download_range(video_url, fd, partial, entry, etag))
+                     for entry in partial.pending()]
+            await asyncio.gather(*tasks)
+        except BaseException:
+            # Arrêter les autres plages avant de fermer le descripteur
+            for task in tasks:
+                task.cancel()
+            await asyncio.gather(*tasks, return_exceptions=True)
+            raise
+        finally:
+            # Les octets comptés dans le manifeste doivent être sur disque
+            try:
+                await _run_in_thread(os.fsync, fd)
+            finally:
+                os.close(fd)
+            partial.save()
+    
+    async def _download_range(self, video_url: str, fd: int, partial: PartialDownload,
+                              entry: List[int], etag: Optional[str]):
+        """Télécharger la fin manquante d'une plage et l'écrire à sa position"""
+        start, end, done = entry
+        session = self.get_session()
+        timeout = aiohttp.ClientTimeout(total=None, sock_read=config.HTTP_TIMEOUT)
+        headers = {'Range': f'bytes={start + done}-{end}', 'Accept-Encoding': 'identity'}
+        if etag and not etag.startswith('W/'):
+            # Le serveur renvoie 200 (fichier complet) si la ressource a changé
+            headers['If-Range'] = etag
+        offset = start + done
+        
+        async with session.get(video_url, headers=headers, timeout=timeout) as response:
+            if response.status != 206:
+                raise ValueError(f"Plage {start}-{end} refusée (HTTP {response.status})")
+            
+            buffer = bytearray()
+            try:
+                async for chunk in response.content.iter_chunked(config.STREAM_CHUNK_SIZE):
+                    if offset + len(buffer) + len(chunk) > end + 1:
+                        raise ValueError(f"Plage {start}-{end} plus longue que prévu")
+                    buffer += chunk
+                    if len(buffer) >= DOWNLOAD_WRITE_BUFFER:
+                        offset = await self._write_range(fd, partial, entry, buffer, offset)
+                        buffer = bytearray()
+            finally:
+                # Octets reçus écrits et comptés même après une erreur ou une
+                # annulation (plage voisine en échec) : la reprise part d'ici
+                if buffer:
+                    offset = await self._write_range(fd, partial, entry, buffer, offset)
+        
+        if offset != end + 1:
+            raise aiohttp.ClientPayloadError(f"Plage {start}-{end} interrompue ({offset - start} octets)")
+    
+    async def _write_range(self, fd: int, partial: PartialDownload, entry: List[int],
+                           data: bytearray, offset: int) -> int:
+        """Écrire un bloc à sa position (dans un thread), retourne la nouvelle position"""
+        await _run_in_thread(os.pwrite, fd, data, offset)
+        if partial.advance(entry, len(data)):
+            await partial.checkpoint(fd)
+        return offset + len(data)
+    
+    async def _download_single(self, video_url: str, filename: str, expected: int = 0) -> int:
+        """Télécharger le fichier en un seul flux (écritures par blocs, dans un thread)"""
+        received = 0
+        try:
+            fd = await _run_in_thread(os.open, filename, os.O_WRONLY | os.O_CREAT | os.O_TRUNC, 0o644)
+            try:
+                buffer = bytearray()
+                async for chunk in self.stream_video(video_url, config.STREAM_CHUNK_SIZE):
+                    buffer += chunk
+                    if len(buffer) >= DOWNLOAD_WRITE_BUFFER:
+                        await _run_in_thread(os.write, fd, buffer)
+                        received += len(buffer)
+                        buffer = bytearray()
+                
+                if buffer:
+                    await _run_in_thread(os.write, fd, buffer)
+                    received += len(buffer)
+            finally:
+                os.close(fd)
+            
+            if expected and received != expected:
+                raise ValueError(f"Taille reçue {received} au lieu de {expected}")
+        except BaseException:
+            if os.path.exists(filename):
+                os.remove(filename)
+            raise
+        
+        return received
+    
+    def is_direct_video_url(self, url: str) -> bool:
+        """Vérifier si l'URL pointe directement vers un fichier MP4"""
+        return urlparse(url).path.lower().endswith('.mp4')
+    
+    async def stream_video(self, video_url: str, chunk_size: int = 256 * 1024,
+                           max_size: int = 0) -> AsyncIterator[bytes]:
+        """
+        Lire une vidéo MP4 directe par blocs, sans l'écrire sur le disque
+        
+        Args:
+            video_url: URL directe du fichier MP4
+            chunk_size: Taille des blocs en bytes
+            max_size: Taille maximale autorisée (0 = illimitée)
+        
+        Yields:
+            bytes: Blocs successifs du corps de la réponse
+        """
+        session = self.get_session()
+        timeout = aiohttp.ClientTimeout(total=None, sock_read=config.HTTP_TIMEOUT)
+        
+        async with session.get(video_url, timeout=timeout) as response:
+            response.raise_for_status()
+            
+            length = response.content_length or 0
+            if max_size and length > max_size:
+                raise ValueError(f"Vidéo trop grande ({self.format_size(length)})")
+            
+            received = 0
+            async for chunk in response.content.iter_chunked(chunk_size):
+                received += len(chunk)
+                if max_size and received > max_size:
+                    raise ValueError("Vidéo trop grande pour Telegram")
+                yield chunk
+    
     def download_progress_hook(self, d):
         """Hook pour suivre la progression"""
         if d['status'] == 'downloading':
@@ -351,31 +977,18 @@ class PinterestDownloader:
     
     def get_quality_name(self, height: int, fmt: Dict) -> str:
         """Obtenir un nom lisible pour la qualité"""
-        if height >= 2160:
-            return "4K"
-        elif height >= 1440:
-            return "2K"
-        elif height >= 1080:
-            return "1080p"
-        elif height >= 720:
-            return "720p"
-        elif height >= 480:
-            return "480p"
-        elif height >= 360:
-            return "360p"
-        elif height >= 240:
-            return "240p"
-        elif height >= 144:
-            return "144p"
+        for min_height, name in QUALITY_RUNGS:
+            if height >= min_height:
+                return name
+        
+        # Essayer de déterminer depuis le format_id
+        format_id = fmt.get('format_id', '').lower()
+        if 'hd' in format_id:
+            return "HD"
+        elif 'sd' in format_id:
+            return "SD"
         else:
-            # Essayer de déterminer depuis le format_id
-            format_id = fmt.get('format_id', '').lower()
-            if 'hd' in format_id:
-                return "HD"
-            elif 'sd' in format_id:
-                return "SD"
-            else:
-                return f"{height}p" if height > 0 else "Unknown"
+            return f"{height}p" if height > 0 else "Unknown"
     
     def format_duration(self, seconds: int) -> str:
         """Formatter la durée"""
@@ -402,10 +1015,64 @@ class PinterestDownloader:
             bytes_size /= 1024.0
         return f"{bytes_size:.1f} TB"
     
+    def get_stats(self) -> Dict:
+        """Obtenir les statistiques du téléchargeur"""
+        return {
+            'workers': self.pool.stats(),
+            'metadata_cache': self.metadata_cache.stats(),
+            'inflight': self.inflight.stats(),
+            'short_links': self.short_links.stats(),
+            'http': dict(self.http_stats),
+            'size_probe': dict(self.size_probe_stats, entries=len(self.size_cache)),
+            'downloads': dict(self.download_stats),
+            'partials': self.partials.stats(),
+            'extraction': {
+                path: dict(counts, hit_rate=counts['hits'] / max(1, counts['hits'] + counts['misses']))
+                for path, counts in self.path_stats.items()
+            },
+        }
+    
+    async def start(self):
+        """Créer la session HTTP partagée (au démarrage du bot)"""
+        self.get_session()
+    
+    def get_session(self) -> aiohttp.ClientSession:
+        """Obtenir la session HTTP partagée (pool de connexions keep-alive)"""
+        if not self.session or self.session.closed:
+            connector = aiohttp.TCPConnector(
+                limit=config.HTTP_POOL_LIMIT,
+                limit_per_host=config.HTTP_POOL_LIMIT_PER_HOST,
+                ttl_dns_cache=config.HTTP_DNS_CACHE_TTL,
+                keepalive_timeout=config.HTTP_KEEPALIVE_TIMEOUT,
+                force_close=False,
+                enable_cleanup_closed=True,
+            )
+            
+            # Compteurs de réutilisation du pool et du cache DNS
+            trace = aiohttp.TraceConfig()
+            trace.on_connection_create_end.append(self._count('connections_created'))
+            trace.on_connection_reuseconn.append(self._count('connections_reused'))
+            trace.on_dns_cache_hit.append(self._count('dns_cache_hits'))
+            trace.on_dns_cache_miss.append(self._count('dns_cache_misses'))
+            
+            self.session = aiohttp.ClientSession(
+                connector=connector,
+                headers=self.headers,
+                trace_configs=[trace],
+            )
+        return self.session
+    
+    def _count(self, name: str):
+        """Créer un callback de trace aiohttp incrémentant un compteur"""
+        async def callback(session, trace_config_ctx, params):
+            self.http_stats[name] += 1
+        return callback
+    
     async def close(self):
-        """Fermer la session"""
+        """Fermer la session et le pool de workers"""
         if self.session:
             await self.session.close()
+        self.pool.shutdown()
     
     def estimate_download_time(self, file_size: int) -> str:
         """Estimer le temps de téléchargement"""
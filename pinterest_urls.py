@@ -0,0 +1,69 @@
+"""
+Reconnaissance des URLs Pinterest
+Un seul motif précompilé, partagé par le bot, le téléchargeur et les utilitaires
+"""
+
+import re
+from typing import Optional
+
+# Domaines Pinterest acceptés
+PINTEREST_DOMAINS = r'(?:com|fr|de|es|it|co\.uk)'
+
+# Fin d'un identifiant : "pin/123abc" n'est pas le pin 123
+PINTEREST_ID_END = r'(?=[/?#\s]|$)'
+
+# Motif unique : lien complet, lien court pin.it ou lien de l'application
+PINTEREST_URL_PATTERN: str = (
+    r'\s*(?:'
+    # https://www.pinterest.com/pin/123/, /<utilisateur>/pin/123, /pin/titre--123
+    r'https?://(?:www\.|[a-z]{2}\.)?pinterest\.' + PINTEREST_DOMAINS +
+    r'(?:/[^/\s?#]+)?/pin/(?:[^/\s?#]*--)?(?P<pin_id>\d+)' + PINTEREST_ID_END +
+    # https://pin.it/abc123
+    r'|https?://pin\.it/(?P<short_code>[A-Za-z0-9]+)' + PINTEREST_ID_END +
+    # pinterest://pin/123
+    r'|pinterest://pin/(?P<app_pin_id>\d+)' + PINTEREST_ID_END +
+    r')'
+)
+
+PINTEREST_URL_REGEX = re.compile(PINTEREST_URL_PATTERN, re.IGNORECASE)
+
+
+def match_pinterest_url(url: str) -> Optional[re.Match]:
+    """
+    Analyser une URL Pinterest en une seule passe
+
+    Args:
+        url: URL à analyser
+
+    Returns:
+        Optional[re.Match]: Groupes pin_id / short_code / app_pin_id, ou None
+    """
+    return PINTEREST_URL_REGEX.match(url)
+
+
+def is_pinterest_url(url: str) -> bool:
+    """Vérifier si l'URL est un lien Pinterest valide"""
+    return PINTEREST_URL_REGEX.match(url) is not None
+
+
+def extract_pin_id(url: str) -> Optional[str]:
+    """
+    Extraire l'ID canonique du pin
+
+    Args:
+        url: URL Pinterest
+
+    Returns:
+        Optional[str]: ID numérique du pin, None pour un lien court ou invalide
+    """
+    match = PINTEREST_URL_REGEX.match(url)
+    if not match:
+        return None
+    return match.group('pin_id') or match.group('app_pin_id')
+
+
+def extract_short_code(url: str) -> Optional[str]:
+    """Extraire le code d'un lien court pin.it"""
+    match = PINTEREST_URL_REGEX.match(url)
+    return match.group('short_code') if match else None
+
@@ -0,0 +1,120 @@
+"""
+Sessions utilisateurs du Pinterest Video Downloader Bot
+Stockage borné en mémoire (TTL + LRU) des vidéos en attente de choix de qualité
+"""
+
+import time
+from collections import OrderedDict
+from typing import Dict, Hashable, List, Optional, Tuple
+
+# Champs d'une qualité nécessaires aux callbacks
+QUALITY_FIELDS = ('quality', 'size', 'filesize', 'url', 'height', 'extension', 'format_id', 'fits')
+
+
+class SessionStore:
+    """Sessions utilisateurs avec expiration, taille maximale et éviction LRU"""
+
+    def __init__(self, ttl: int, max_entries: int):
+        self.ttl = ttl
+        self.max_entries = max(1, max_entries)
+
+        # user_id -> (dernier accès, session compacte), du moins au plus récent
+        self._sessions: "OrderedDict[Hashable, Tuple[float, Dict]]" = OrderedDict()
+
+        self.evictions = 0
+        self.expirations = 0
+
+    @staticmethod
+    def compact(video_info: Dict) -> Dict:
+        """
+        Réduire video_info aux seuls champs utilisés par les callbacks
+
+        Args:
+            video_info: Informations complètes de la vidéo
+
+        Returns:
+            Dict: Session compacte (sans description, formats, miniatures...)
+        """
+        qualities: List[Dict] = []
+        for index, quality in enumerate(video_info.get('qualities', [])):
+            entry = {field: quality[field] for field in QUALITY_FIELDS if field in quality}
+            entry['id'] = quality.get('format_id') or str(index)
+            qualities.append(entry)
+
+        return {
+            'title': video_info.get('title', 'Sans titre'),
+            'duration': video_info.get('duration', 'Inconnue'),
+            'pin_id': video_info.get('pin_id'),
+            'qualities': qualities,
+        }
+
+    def put(self, user_id: Hashable, video_info: Dict) -> Dict:
+        """
+        Enregistrer la session d'un utilisateur
+
+        Args:
+            user_id: ID Telegram de l'utilisateur
+            video_info: Informations complètes de la vidéo
+
+        Returns:
+            Dict: Session compacte enregistrée
+        """
+        now = time.monotonic()
+        session = self.compact(video_info)
+
+        self._sessions.pop(user_id, None)
+        self._sessions[user_id] = (now, session)
+
+        self._expire(now)
+        while len(self._sessions) > self.max_entries:
+            self._sessions.popitem(last=False)
+            self.evictions += 1
+
+        return session
+
+    def get(self, user_id: Hashable) -> Optional[Dict]:
+        """
+        Obtenir la session d'un utilisateur
+
+        Args:
+            user_id: ID Telegram de l'utilisateur
+
+        Returns:
+            Optional[Dict]: Session compacte ou None si absente/expirée
+        """
+        entry = self._sessions.get(user_id)
+        if entry is None:
+            return None
+
+        now = time.monotonic()
+        last_access, session = entry
+        if now - last_access > self.ttl:
+            del self._sessions[user_id]
+            self.expirations += 1
+            return None
+
+        self._sessions[user_id] = (now, session)
+        self._sessions.move_to_end(user_id)
+        return session
+
+    def _expire(self, now: float):
+        """Supprimer les sessions expirées (les plus anciennes sont en tête)"""
+        while self._sessions:
+            user_id, (last_access, session) = next(iter(self._sessions.items()))
+            if now - last_access <= self.ttl:
+                break
+            del self._sessions[user_id]
+            self.expirations += 1
+
+    def __len__(self) -> int:
+        return len(self._sessions)
+
+    def stats(self) -> Dict:
+        """Obtenir les statistiques des sessions"""
+        self._expire(time.monotonic())
+        return {
+            'size': len(self._sessions),
+            'max_entries': self.max_entries,
+            'evictions': self.evictions,
+            'expirations': self.expirations,
+        }
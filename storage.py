@@ -0,0 +1,326 @@
+"""
+Stockage SQLite du Pinterest Video Downloader Bot
+Base unique en mode WAL : historique des téléchargements, compteurs par utilisateur,
+index des file_id Telegram, des vidéos en cache et des liens courts pin.it
+
+Le cache des métadonnées de pins reste hors de la base (un fichier JSON par pin,
+voir cache.MetadataCache) : ce sont des blocs volumineux, à durée de vie limitée
+et reconstructibles, qui gonfleraient le WAL à chaque extraction.
+"""
+
+import time
+import queue
+import sqlite3
+import asyncio
+import threading
+from collections import OrderedDict
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS downloads (
+    id INTEGER PRIMARY KEY,
+    user_id INTEGER NOT NULL,
+    username TEXT,
+    url TEXT,
+    pin_id TEXT,
+    quality TEXT,
+    success INTEGER NOT NULL,
+    file_size INTEGER NOT NULL DEFAULT 0,
+    created_at REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS downloads_user ON downloads (user_id, created_at);
+
+CREATE TABLE IF NOT EXISTS user_stats (
+    user_id INTEGER PRIMARY KEY,
+    total INTEGER NOT NULL DEFAULT 0,
+    success INTEGER NOT NULL DEFAULT 0,
+    failed INTEGER NOT NULL DEFAULT 0,
+    bytes INTEGER NOT NULL DEFAULT 0,
+    last_at REAL
+);
+
+CREATE TABLE IF NOT EXISTS file_ids (
+    key TEXT PRIMARY KEY,
+    value TEXT NOT NULL,
+    updated_at REAL NOT NULL
+);
+
+CREATE TABLE IF NOT EXISTS video_keys (
+    key TEXT PRIMARY KEY,
+    value TEXT NOT NULL,
+    updated_at REAL NOT NULL
+);
+
+CREATE TABLE IF NOT EXISTS short_links (
+    key TEXT PRIMARY KEY,
+    value TEXT NOT NULL,
+    updated_at REAL NOT NULL
+);
+"""
+
+# Requêtes constantes : préparées une fois puis réutilisées par le cache de sqlite3
+INSERT_DOWNLOAD = """
+INSERT INTO downloads (user_id, username, url, pin_id, quality, success, file_size, created_at)
+VALUES (?, ?, ?, ?, ?, ?, ?, ?)
+"""
+
+UPSERT_USER_STATS = """
+INSERT INTO user_stats (user_id, total, success, failed, bytes, last_at)
+VALUES (?, 1, ?, ?, ?, ?)
+ON CONFLICT (user_id) DO UPDATE SET
+    total = total + 1,
+    success = success + excluded.success,
+    failed = failed + excluded.failed,
+    bytes = bytes + excluded.bytes,
+    last_at = COALESCE(excluded.last_at, last_at)
+"""
+
+SELECT_USER_STATS = """
+SELECT total, success, failed, bytes, last_at FROM user_stats WHERE user_id = ?
+"""
+
+SELECT_USER_HISTORY = """
+SELECT pin_id, quality, success, file_size, created_at FROM downloads
+WHERE user_id = ? ORDER BY created_at DESC LIMIT ?
+"""
+
+# Tables des index clé -> valeur (noms fixes, jamais fournis par l'utilisateur)
+INDEX_TABLES = ('file_ids', 'video_keys', 'short_links')
+
+
+class Storage:
+    """
+    Base SQLite (WAL) avec un thread écrivain dédié
+
+    Les écritures sont déposées dans une file et validées par lots (une
+    transaction par lot) ; les lectures passent par une connexion séparée
+    exécutée hors de la boucle asyncio.
+    """
+
+    def __init__(self, path: Path, batch_size: int = 200, commit_interval: float = 0.5):
+        self.path = Path(path)
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self.batch_size = batch_size
+        self.commit_interval = commit_interval
+
+        conn = self._connect()
+        conn.executescript(SCHEMA)
+        conn.close()
+
+        self._reader = self._connect(check_same_thread=False)
+        self._reader_lock = threading.Lock()
+
+        self._queue: "queue.Queue[Optional[Tuple[str, tuple]]]" = queue.Queue()
+        self._writer = threading.Thread(target=self._write_loop, name="sqlite-writer", daemon=True)
+        self._writer.start()
+
+        self.commits = 0
+        self.statements = 0
+        self.errors = 0
+
+    def _connect(self, check_same_thread: bool = True) -> sqlite3.Connection:
+        conn = sqlite3.connect(self.path, check_same_thread=check_same_thread, cached_statements=64)
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.execute("PRAGMA synchronous=NORMAL")
+        conn.execute("PRAGMA busy_timeout=5000")
+        return conn
+
+    def execute(self, sql: str, params: tuple = ()):
+        """Déposer une écriture (retour immédiat, validée au prochain lot)"""
+        self._queue.put((sql, params))
+
+    def _write_loop(self):
+        """Thread écrivain : regrouper les écritures en transactions"""
+        conn = self._connect()
+        stopping = False
+
+        while not stopping:
+            operation = self._queue.get()
+            if operation is None:
+                break
+            batch = [operation]
+
+            # Fenêtre de regroupement : une seule validation pour le lot
+            deadline = time.monotonic() + self.commit_interval
+            while len(batch) < self.batch_size:
+                timeout = deadline - time.monotonic()
+                if timeout <= 0:
+                    break
+                try:
+                    operation = self._queue.get(timeout=timeout)
+                except queue.Empty:
+                    break
+                if operation is None:
+                    stopping = True
+                    break
+                batch.append(operation)
+
+            self._commit(conn, batch)
+
+        conn.close()
+
+    def _commit(self, conn: sqlite3.Connection, batch: List[Tuple[str, tuple]]):
+        try:
+            with conn:
+                for sql, params in batch:
+                    conn.execute(sql, params)
+            self.commits += 1
+            self.statements += len(batch)
+        except sqlite3.Error as e:
+            # Lot annulé : rejouer les requêtes une par une pour isoler la fautive
+            print(f"⚠️ Erreur SQLite (lot de {len(batch)}): {e}")
+            for sql, params in batch:
+                try:
+                    with conn:
+                        conn.execute(sql, params)
+                    self.statements += 1
+                except sqlite3.Error as e:
+                    self.errors += 1
+                    print(f"⚠️ Requête SQLite ignorée: {e}")
+
+    def query(self, sql: str, params: tuple = ()) -> List[tuple]:
+        """Lecture bloquante (démarrage, ou depuis un thread)"""
+        with self._reader_lock:
+            return self._reader.execute(sql, params).fetchall()
+
+    async def query_async(self, sql: str, params: tuple = ()) -> List[tuple]:
+        """Lecture sans bloquer la boucle asyncio"""
+        return await asyncio.to_thread(self.query, sql, params)
+
+    def record_download(self, user_id: int, username: str, url: str, pin_id: Optional[str],
+                        quality: str, success: bool, file_size: int = 0):
+        """
+        Ajouter un téléchargement à l'historique et aux compteurs de l'utilisateur
+
+        Args:
+            user_id: ID Telegram de l'utilisateur
+            username: Nom d'utilisateur
+            url: URL du pin
+            pin_id: ID du pin (None si inconnu)
+            quality: Qualité choisie
+            success: Si le téléchargement a réussi
+            file_size: Taille du fichier en bytes
+        """
+        now = time.time()
+        self.execute(INSERT_DOWNLOAD, (user_id, username, url[:200], pin_id, quality,
+                                       int(success), file_size, now))
+        self.execute(UPSERT_USER_STATS, (user_id, int(success), int(not success),
+                                         file_size if success else 0, now if success else None))
+
+    async def user_stats(self, user_id: int, history: int = 3) -> Dict:
+        """
+        Obtenir les compteurs et les derniers téléchargements d'un utilisateur
+
+        Args:
+            user_id: ID Telegram de l'utilisateur
+            history: Nombre de téléchargements récents à inclure
+
+        Returns:
+            Dict: total, success, failed, bytes, last_at et recent
+        """
+        rows = await self.query_async(SELECT_USER_STATS, (user_id,))
+        total, success, failed, size, last_at = rows[0] if rows else (0, 0, 0, 0, None)
+        recent = await self.query_async(SELECT_USER_HISTORY, (user_id, history)) if rows else []
+        return {
+            'total': total,
+            'success': success,
+            'failed': failed,
+            'bytes': size,
+            'last_at': last_at,
+            'recent': [
+                {'pin_id': pin_id, 'quality': quality, 'success': bool(ok),
+                 'file_size': file_size, 'created_at': created_at}
+                for pin_id, quality, ok, file_size, created_at in recent
+            ],
+        }
+
+    def close(self):
+        """Valider les écritures en attente et fermer la base (bloquant)"""
+        self._queue.put(None)
+        self._writer.join()
+        with self._reader_lock:
+            self._reader.close()
+
+    def stats(self) -> Dict:
+        """Obtenir les statistiques de la base"""
+        return {
+            'pending': self._queue.qsize(),
+            'commits': self.commits,
+            'statements': self.statements,
+            'errors': self.errors,
+        }
+
+
+class SqliteIndex:
+    """Index clé -> valeur en mémoire (LRU), persisté dans une table de Storage"""
+
+    def __init__(self, storage: Storage, table: str, max_entries: int):
+        if table not in INDEX_TABLES:
+            raise ValueError(f"Table d'index inconnue: {table}")
+        self.storage = storage
+        self.table = table
+        self.max_entries = max_entries
+
+        self._upsert = (f"INSERT INTO {table} (key, value, updated_at) VALUES (?, ?, ?) "
+                        f"ON CONFLICT (key) DO UPDATE SET value = excluded.value, "
+                        f"updated_at = excluded.updated_at")
+        self._delete = f"DELETE FROM {table} WHERE key = ?"
+
+        # clé -> valeur, ordre LRU (chargé une fois au démarrage)
+        self._entries: "OrderedDict[str, str]" = OrderedDict(
+            storage.query(f"SELECT key, value FROM {table} ORDER BY updated_at")
+        )
+        while len(self._entries) > self.max_entries:
+            key, value = self._entries.popitem(last=False)
+            self.storage.execute(self._delete, (key,))
+
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, key: str) -> Optional[str]:
+        """
+        Obtenir la valeur associée à une clé
+
+        Args:
+            key: Clé de l'index
+
+        Returns:
+            Optional[str]: Valeur ou None
+        """
+        value = self._entries.get(key)
+        if value is None:
+            self.misses += 1
+            return None
+
+        self._entries.move_to_end(key)
+        self.hits += 1
+        return value
+
+    def put(self, key: str, value: str):
+        """Enregistrer une valeur"""
+        self._entries.pop(key, None)
+        self._entries[key] = value
+        self.storage.execute(self._upsert, (key, value, time.time()))
+        while len(self._entries) > self.max_entries:
+            evicted, _ = self._entries.popitem(last=False)
+            self.storage.execute(self._delete, (evicted,))
+
+    def remove(self, key: str):
+        """Oublier une clé"""
+        if self._entries.pop(key, None) is not None:
+            self.storage.execute(self._delete, (key,))
+
+    def items(self) -> List[Tuple[str, str]]:
+        """Copie des entrées (clé, valeur), de la moins à la plus récente"""
+        return list(self._entries.items())
+
+    def stats(self) -> Dict:
+        """Obtenir les statistiques de l'index"""
+        lookups = self.hits + self.misses
+        return {
+            'entries': len(self._entries),
+            'hits': self.hits,
+            'misses': self.misses,
+            'hit_rate': self.hits / lookups if lookups else 0.0,
+        }
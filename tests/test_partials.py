@@ -0,0 +1,133 @@
+"""Tests des téléchargements partiels (plages, manifeste et reprise)"""
+
+import asyncio
+import json
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from partials import PartialStore
+
+URL = "https://v1.pinimg.com/videos/mc/720p/ab/cd/video.mp4"
+TOTAL = 1000
+
+
+def _store(tmp_path, checkpoint_bytes=100):
+    return PartialStore(tmp_path, retention_hours=1, checkpoint_bytes=checkpoint_bytes)
+
+
+def _allocate(partial):
+    """Créer le fichier partiel à sa taille finale, comme _download_ranges"""
+    with open(partial.data_path, 'wb') as f:
+        f.truncate(partial.total)
+
+
+def test_key_ignores_signature_parameters():
+    assert PartialStore.key(URL + "?sig=1&exp=2") == PartialStore.key(URL)
+    assert PartialStore.key(URL) != PartialStore.key(URL.replace("720p", "480p"))
+
+
+def test_new_partial_splits_ranges_and_saves_manifest(tmp_path):
+    store = _store(tmp_path)
+    partial = store.open("k", URL, TOTAL, '"v1"', connections=3)
+
+    assert partial.ranges == [[0, 333, 0], [334, 667, 0], [668, 999, 0]]
+    assert partial.done == 0
+    assert len(partial.pending()) == 3
+
+    with open(partial.manifest_path, 'r', encoding='utf-8') as f:
+        manifest = json.load(f)
+    assert manifest['total'] == TOTAL
+    assert manifest['etag'] == '"v1"'
+    assert manifest['ranges'] == partial.ranges
+
+
+def test_resume_restores_checkpointed_ranges(tmp_path):
+    store = _store(tmp_path, checkpoint_bytes=100)
+    partial = store.open("k", URL, TOTAL, '"v1"', connections=2)
+    _allocate(partial)
+
+    first, second = partial.ranges
+    assert not partial.advance(first, 60)
+    assert partial.advance(first, 40)
+
+    fd = os.open(partial.data_path, os.O_WRONLY)
+    try:
+        asyncio.run(partial.checkpoint(fd))
+    finally:
+        os.close(fd)
+
+    # Octets reçus après le point de sauvegarde : perdus en cas d'arrêt brutal
+    partial.advance(second, 50)
+
+    resumed = _store(tmp_path).open("k", URL + "?sig=2", TOTAL, '"v1"', connections=2)
+    assert resumed.ranges == [[0, 499, 100], [500, 999, 0]]
+    assert resumed.done == 100
+    assert resumed.manifest['url'] == URL + "?sig=2"
+    assert resumed.pending() == resumed.ranges
+
+
+def test_resume_counts_resumed_bytes(tmp_path):
+    partial = _store(tmp_path).open("k", URL, TOTAL, None, connections=2)
+    _allocate(partial)
+    partial.ranges[0][2] = 500
+    partial.save()
+
+    store = _store(tmp_path)
+    resumed = store.open("k", URL, TOTAL, None, connections=2)
+    assert resumed.pending() == [[500, 999, 0]]
+    assert store.stats()['resumed'] == 1
+    assert store.stats()['bytes_resumed'] == 500
+
+
+def test_changed_resource_discards_partial(tmp_path):
+    partial = _store(tmp_path).open("k", URL, TOTAL, '"v1"', connections=2)
+    _allocate(partial)
+    partial.ranges[0][2] = 500
+    partial.save()
+
+    store = _store(tmp_path)
+    fresh = store.open("k", URL, TOTAL, '"v2"', connections=2)
+    assert fresh.done == 0
+    assert fresh.manifest['etag'] == '"v2"'
+    assert not fresh.data_path.exists()
+    assert store.stats()['discarded'] == 1
+
+
+def test_truncated_data_file_is_not_resumed(tmp_path):
+    partial = _store(tmp_path).open("k", URL, TOTAL, None, connections=2)
+    partial.ranges[0][2] = 500
+    partial.save()
+
+    fresh = _store(tmp_path).open("k", URL, TOTAL, None, connections=2)
+    assert fresh.done == 0
+
+
+def test_complete_moves_file_and_forgets_manifest(tmp_path):
+    partial = _store(tmp_path).open("k", URL, TOTAL, None, connections=1)
+    _allocate(partial)
+
+    destination = tmp_path / "video.mp4"
+    partial.complete(str(destination))
+    assert destination.stat().st_size == TOTAL
+    assert not partial.data_path.exists()
+    assert not partial.manifest_path.exists()
+
+
+def test_purge_keeps_claimed_partials(tmp_path):
+    store = _store(tmp_path)
+    claimed_key = PartialStore.key(URL)
+    for key in (claimed_key, "abandonne"):
+        store.open(key, URL, TOTAL, None, connections=1)
+        old = time.time() - 2 * 3600
+        os.utime(tmp_path / f"{key}.json", (old, old))
+
+    async def purge_while_claimed():
+        async with store.claim(URL):
+            return store.purge()
+
+    assert asyncio.run(purge_while_claimed()) == 1
+    assert (tmp_path / f"{claimed_key}.json").exists()
+    assert not (tmp_path / "abandonne.json").exists()
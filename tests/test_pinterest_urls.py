@@ -0,0 +1,42 @@
+"""Tests de la reconnaissance des URLs Pinterest"""
+
+import os
+import sys
+
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from pinterest_urls import extract_pin_id, extract_short_code, is_pinterest_url
+
+
+@pytest.mark.parametrize("url, pin_id", [
+    ("https://www.pinterest.com/pin/123456789/", "123456789"),
+    ("https://pinterest.fr/pin/123456789", "123456789"),
+    ("https://fr.pinterest.com/user/pin/987654321/", "987654321"),
+    ("https://www.pinterest.com/pin/titre-du-pin--555/", "555"),
+    ("https://www.pinterest.com/pin/123?utm_source=x", "123"),
+    ("https://www.pinterest.com/pin/123#comments", "123"),
+    ("pinterest://pin/42", "42"),
+])
+def test_extract_pin_id(url, pin_id):
+    assert extract_pin_id(url) == pin_id
+
+
+@pytest.mark.parametrize("url", [
+    "https://www.pinterest.com/pin/123abc",
+    "https://www.pinterest.com/pin/123abc/",
+    "pinterest://pin/42x",
+    "https://pin.it/abc-def",
+    "https://example.com/pin/123/",
+    "Regarde cette vidéo !",
+])
+def test_malformed_links_are_rejected(url):
+    assert not is_pinterest_url(url)
+    assert extract_pin_id(url) is None
+
+
+def test_short_code():
+    assert extract_short_code("https://pin.it/3xAmPlE") == "3xAmPlE"
+    assert extract_short_code("https://pin.it/3xAmPlE/") == "3xAmPlE"
+    assert extract_pin_id("https://pin.it/3xAmPlE") is None
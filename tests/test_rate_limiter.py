@@ -0,0 +1,70 @@
+"""Tests des seaux à jetons par utilisateur"""
+
+import os
+import sys
+import time
+
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from concurrency import RateLimiter
+
+
+class Clock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self):
+        return self.now
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    clock = Clock()
+    monkeypatch.setattr(time, "monotonic", clock)
+    return clock
+
+
+def test_burst_then_retry_after(clock):
+    limiter = RateLimiter(capacity=3, period=60)
+    assert [limiter.try_acquire("a") for _ in range(3)] == [0.0, 0.0, 0.0]
+    assert limiter.try_acquire("a") == pytest.approx(20.0)
+    assert limiter.rejected == 1
+    # Les autres utilisateurs ne sont pas concernés
+    assert limiter.try_acquire("b") == 0.0
+
+
+def test_tokens_refill_over_time(clock):
+    limiter = RateLimiter(capacity=3, period=60)
+    for _ in range(3):
+        limiter.try_acquire("a")
+
+    clock.now += 10
+    assert limiter.try_acquire("a") == pytest.approx(10.0)
+    clock.now += 10
+    assert limiter.try_acquire("a") == 0.0
+
+
+def test_refund_returns_a_token(clock):
+    limiter = RateLimiter(capacity=1, period=60)
+    assert limiter.try_acquire("a") == 0.0
+    limiter.refund("a")
+    assert limiter.try_acquire("a") == 0.0
+
+
+def test_idle_buckets_are_forgotten(clock):
+    limiter = RateLimiter(capacity=2, period=60)
+    limiter.try_acquire("a")
+    clock.now += 30
+    limiter.try_acquire("b")
+    assert len(limiter) == 2
+
+    clock.now += 30
+    limiter.try_acquire("c")
+    assert len(limiter) == 2
+    assert limiter.evicted == 1
+
+    # Un seau oublié repart plein
+    assert limiter.try_acquire("a") == 0.0
+    assert limiter.try_acquire("a") == 0.0
@@ -0,0 +1,118 @@
+"""Tests de l'ordonnanceur équitable des téléchargements"""
+
+import asyncio
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from concurrency import FairScheduler
+
+SMALL = 10
+LARGE = 1000
+
+
+def _recorder(order, name):
+    async def job():
+        order.append(name)
+        return name
+    return job
+
+
+def _serve(submissions, max_small_streak=3):
+    """Soumettre toutes les tâches à un seul worker et renvoyer l'ordre de service"""
+    async def main():
+        scheduler = FairScheduler(1, small_job_size=100, max_small_streak=max_small_streak)
+        order = []
+        jobs = [scheduler.submit(user_id, size, _recorder(order, name))
+                for name, user_id, size in submissions]
+        await asyncio.gather(*(job.future for job in jobs))
+        scheduler.stop()
+        return order
+    return asyncio.run(main())
+
+
+def test_small_jobs_first_without_starving_large_ones():
+    order = _serve([
+        ("gros", "a", LARGE),
+        ("b", "b", SMALL),
+        ("c", "c", SMALL),
+        ("d", "d", SMALL),
+        ("e", "e", SMALL),
+        ("f", "f", SMALL),
+    ])
+    assert order == ["b", "c", "d", "gros", "e", "f"]
+
+
+def test_round_robin_between_users():
+    order = _serve([
+        ("a1", "a", SMALL),
+        ("a2", "a", SMALL),
+        ("a3", "a", SMALL),
+        ("b1", "b", SMALL),
+    ])
+    assert order == ["a1", "b1", "a2", "a3"]
+
+
+def test_user_queue_serves_smallest_first():
+    order = _serve([
+        ("gros", "a", LARGE),
+        ("petit", "a", SMALL),
+    ])
+    assert order == ["petit", "gros"]
+
+
+def test_position_follows_service_order_and_skips_cancelled():
+    async def main():
+        scheduler = FairScheduler(1, small_job_size=100)
+        scheduler.avg_duration = 5.0
+        order = []
+        large = scheduler.submit("a", LARGE, _recorder(order, "gros"))
+        small = [scheduler.submit(user_id, SMALL, _recorder(order, user_id))
+                 for user_id in "bcd"]
+        positions = scheduler.position(large), scheduler.position(small[0])
+
+        small[1].future.cancel()
+        after_cancel = scheduler.position(large)
+
+        await asyncio.gather(large.future, small[0].future, small[2].future)
+        scheduler.stop()
+        return positions, after_cancel, order
+
+    positions, after_cancel, order = asyncio.run(main())
+    assert positions == ((4, 20.0), (1, 5.0))
+    assert after_cancel == (3, 15.0)
+    assert order == ["b", "d", "gros"]
+
+
+def test_cancelled_jobs_do_not_stop_workers():
+    async def main():
+        scheduler = FairScheduler(1, small_job_size=100)
+        started = asyncio.Event()
+
+        async def slow():
+            started.set()
+            await asyncio.sleep(60)
+
+        async def cancels_itself():
+            raise asyncio.CancelledError
+
+        async def ok():
+            return 42
+
+        abandoned = scheduler.submit("a", SMALL, slow)
+        await started.wait()
+        abandoned.future.cancel()
+        interrupted = scheduler.submit("a", SMALL, cancels_itself)
+        last = scheduler.submit("b", SMALL, ok)
+
+        result = await asyncio.wait_for(last.future, 1)
+        stats = scheduler.stats()
+        scheduler.stop()
+        return result, interrupted.future.cancelled(), stats
+
+    result, interrupted_cancelled, stats = asyncio.run(main())
+    assert result == 42
+    assert interrupted_cancelled
+    assert stats['running'] == 0
+    assert stats['completed'] == 3
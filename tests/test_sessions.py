@@ -0,0 +1,86 @@
+"""Tests des sessions utilisateurs (expiration et éviction LRU)"""
+
+import os
+import sys
+import time
+
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from sessions import SessionStore
+
+VIDEO_INFO = {
+    'title': "Recette",
+    'duration': "0:42",
+    'pin_id': "123",
+    'description': "Longue description inutile aux callbacks",
+    'formats': [{'format_id': 'hls-720p'}],
+    'qualities': [
+        {'quality': '720p', 'size': '4 MB', 'url': 'https://v1.pinimg.com/720p.mp4',
+         'format_id': 'hls-720p', 'fits': True, 'thumbnail': 'x'},
+        {'quality': '480p', 'url': 'https://v1.pinimg.com/480p.mp4'},
+    ],
+}
+
+
+class Clock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self):
+        return self.now
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    clock = Clock()
+    monkeypatch.setattr(time, "monotonic", clock)
+    return clock
+
+
+def test_session_is_compacted():
+    session = SessionStore(ttl=60, max_entries=10).put(1, VIDEO_INFO)
+    assert set(session) == {'title', 'duration', 'pin_id', 'qualities'}
+    assert session['qualities'][0]['id'] == 'hls-720p'
+    assert 'thumbnail' not in session['qualities'][0]
+    assert session['qualities'][1]['id'] == '1'
+
+
+def test_session_expires_after_ttl(clock):
+    store = SessionStore(ttl=60, max_entries=10)
+    store.put(1, VIDEO_INFO)
+
+    clock.now += 60
+    assert store.get(1) is not None
+    clock.now += 61
+    assert store.get(1) is None
+    assert store.stats()['expirations'] == 1
+
+
+def test_get_refreshes_expiry(clock):
+    store = SessionStore(ttl=60, max_entries=10)
+    store.put(1, VIDEO_INFO)
+    store.put(2, VIDEO_INFO)
+
+    clock.now += 50
+    store.get(1)
+    clock.now += 50
+    store.put(3, VIDEO_INFO)
+
+    assert store.get(1) is not None
+    assert store.get(2) is None
+    assert len(store) == 2
+
+
+def test_least_recently_used_session_is_evicted(clock):
+    store = SessionStore(ttl=60, max_entries=2)
+    store.put(1, VIDEO_INFO)
+    store.put(2, VIDEO_INFO)
+    store.get(1)
+    store.put(3, VIDEO_INFO)
+
+    assert store.get(2) is None
+    assert store.get(1) is not None
+    assert store.get(3) is not None
+    assert store.stats()['evictions'] == 1
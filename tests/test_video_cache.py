@@ -0,0 +1,128 @@
+"""Tests du cache disque des vidéos (prêts, éviction et index des clés)"""
+
+import asyncio
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from cache import VideoCache
+
+
+class DictIndex(dict):
+    """Index en mémoire avec l'interface de storage.SqliteIndex"""
+
+    def put(self, key, value):
+        self[key] = value
+
+    def remove(self, key):
+        self.pop(key, None)
+
+
+def _download(tmp_path, name, content):
+    path = tmp_path / name
+    path.write_bytes(content)
+    return str(path)
+
+
+def _cache(tmp_path, keys=None, max_size=250):
+    return VideoCache(tmp_path / "videos", keys if keys is not None else DictIndex(), max_size)
+
+
+def test_put_then_get_shares_one_file(tmp_path):
+    async def main():
+        cache = _cache(tmp_path)
+        cached = await cache.put("1:720p", _download(tmp_path, "a.mp4", b"a" * 100))
+        cache.release(cached)
+        found = await cache.get("1:720p")
+        cache.release(found)
+        return cache, cached, found
+
+    cache, cached, found = asyncio.run(main())
+    assert found == cached
+    assert not (tmp_path / "a.mp4").exists()
+    assert cache.stats()['hits'] == 1
+    assert cache.stats()['leased'] == 0
+
+
+def test_concurrent_puts_of_same_content_count_once(tmp_path):
+    async def main():
+        cache = _cache(tmp_path)
+        paths = await asyncio.gather(
+            cache.put("1:720p", _download(tmp_path, "a.mp4", b"x" * 100)),
+            cache.put("2:720p", _download(tmp_path, "b.mp4", b"x" * 100)),
+        )
+        return cache, paths
+
+    cache, paths = asyncio.run(main())
+    assert paths[0] == paths[1]
+    assert cache.total_size == 100
+    assert sorted(cache.keys) == ["1:720p", "2:720p"]
+
+
+def test_eviction_drops_video_and_its_keys(tmp_path):
+    async def main():
+        cache = _cache(tmp_path, max_size=250)
+        for key, content in (("1:720p", b"a" * 100), ("2:720p", b"a" * 100), ("3:720p", b"b" * 100)):
+            cache.release(await cache.put(key, _download(tmp_path, key, content)))
+        cache.release(await cache.put("4:720p", _download(tmp_path, "d", b"c" * 100)))
+        return cache
+
+    cache = asyncio.run(main())
+    assert cache.total_size == 200
+    assert cache.stats()['evictions'] == 1
+    assert sorted(cache.keys) == ["3:720p", "4:720p"]
+
+
+def test_leased_video_is_not_evicted_until_released(tmp_path):
+    async def main():
+        cache = _cache(tmp_path, max_size=150)
+        reading = await cache.put("1:720p", _download(tmp_path, "a", b"a" * 100))
+        newer = await cache.put("2:720p", _download(tmp_path, "b", b"b" * 100))
+
+        # Les deux vidéos sont prêtées : dépassement toléré
+        over_limit = cache.total_size
+        cache.release(newer)
+        kept = os.path.exists(reading)
+        cache.release(reading)
+        return cache, reading, over_limit, kept
+
+    cache, reading, over_limit, kept = asyncio.run(main())
+    assert over_limit == 200
+    # À la libération de la seconde, seule elle était évictable
+    assert kept
+    assert cache.total_size == 100
+    assert os.path.exists(reading)
+
+
+def test_reload_forgets_keys_of_missing_videos(tmp_path):
+    async def main():
+        cache = _cache(tmp_path)
+        cache.release(await cache.put("1:720p", _download(tmp_path, "a", b"a" * 100)))
+        return cache
+
+    keys = asyncio.run(main()).keys
+    keys.put("2:720p", "0" * 32)
+
+    reloaded = _cache(tmp_path, keys)
+    assert sorted(reloaded.keys) == ["1:720p"]
+    assert reloaded.total_size == 100
+
+
+def test_corrupted_video_is_discarded(tmp_path):
+    async def main():
+        cache = _cache(tmp_path)
+        cache.release(await cache.put("1:720p", _download(tmp_path, "a", b"a" * 100)))
+        return cache
+
+    keys = asyncio.run(main()).keys
+    # Après redémarrage, l'intégrité est vérifiée à la première lecture
+    path = tmp_path / "videos" / f"{keys['1:720p']}.mp4"
+    path.write_bytes(b"z" * 100)
+
+    reloaded = _cache(tmp_path, keys)
+    assert asyncio.run(reloaded.get("1:720p")) is None
+    assert not path.exists()
+    assert reloaded.stats()['corrupted'] == 1
+    assert reloaded.total_size == 0
+    assert not reloaded.keys
@@ -1,14 +1,375 @@
 import os
 import time
+import asyncio
+import contextlib
 import json
+import glob
 import shutil
 import hashlib
 import random
 import string
 from datetime import datetime, timedelta
-from typing import Optional, Dict, List, Tuple
+from typing import AsyncIterator, Optional, Dict, List, Tuple
+import re
 import subprocess
 import mimetypes
+from collections import OrderedDict
+import metrics
+import pinterest_urls
+
+# Motifs précompilés une seule fois (utilisés pour chaque message)
+URL_PATTERN = re.compile(
+    r'^(https?://)?'  # http:// or https://
+    r'(?:(?:[A-Z0-9](?:[A-Z0-9-]{0,61}[A-Z0-9])?\.)+[A-Z]{2,6}\.?|'  # domaine
+    r'localhost|'  # localhost
+    r'\d{1,3}\.\d{1,3}\.\d{1,3}\.\d{1,3})'  # IP
+    r'(?::\d+)?'  # port
+    r'(?:/?|[/?]\S+)$', re.IGNORECASE)
+
+URL_IN_TEXT_PATTERN = re.compile(
+    r'https?://(?:[-\w.]|(?:%[\da-fA-F]{2}))+[/?=\w&%.#-]*'
+)
+
+# Transcodages ffmpeg simultanés : la moitié des cœurs, chacun avec 2 threads,
+# pour ne jamais dépasser le nombre de cœurs disponibles
+CPU_COUNT = os.cpu_count() or 1
+FFMPEG_MAX_PROCESSES = max(1, CPU_COUNT // 2)
+FFMPEG_THREADS = max(1, CPU_COUNT // FFMPEG_MAX_PROCESSES)
+
+_ffmpeg_slots: Optional[asyncio.Semaphore] = None
+
+# Découpage : fraction de la taille maximum visée par partie (marge pour
+# les coupes alignées sur les images clés) et intervalle de suivi de ffmpeg
+SPLIT_SIZE_MARGIN = 0.9
+SPLIT_POLL_INTERVAL = 0.5
+
+# Paliers de qualité (hauteur minimale, nom), du plus haut au plus bas :
+# noms de get_quality_name et échelle de réduction de fit_video
+QUALITY_RUNGS = (
+    (2160, "4K"),
+    (1440, "2K"),
+    (1080, "1080p"),
+    (720, "720p"),
+    (480, "480p"),
+    (360, "360p"),
+    (240, "240p"),
+    (144, "144p"),
+)
+QUALITY_LADDER = tuple(height for height, name in QUALITY_RUNGS)
+
+# Compression : remux tenté seulement si la source dépasse la cible de 10 %
+# au plus, débit audio fixe et marge pour le surcoût du conteneur MP4
+REMUX_TOLERANCE = 1.1
+COMPRESS_AUDIO_BITRATE = 128000
+CONTAINER_OVERHEAD = 0.97
+
+# Résultats de ffprobe mémoïsés par (chemin, mtime, taille)
+PROBE_CACHE_SIZE = 256
+_probe_cache: "OrderedDict[Tuple[str, int, int], Dict]" = OrderedDict()
+
+# Journaux de téléchargements et instantané des compteurs agrégés
+DOWNLOAD_LOG_DIR = "temp/logs"
+STATS_SNAPSHOT_FILE = "stats_snapshot.json"
+STATS_SNAPSHOT_EVERY = 100  # Entrées entre deux sauvegardes de l'instantané
+STATS_DAYS_KEPT = 90        # Compteurs quotidiens conservés dans l'instantané
+
+# Écriture des journaux par lots dans une tâche de fond (voir DownloadLogWriter)
+LOG_QUEUE_SIZE = 10000     # Entrées en attente au-delà desquelles on abandonne
+LOG_BATCH_SIZE = 500       # Entrées écrites au plus par lot
+LOG_FSYNC_INTERVAL = 5.0   # Secondes entre deux fsync
+
+_download_stats: Optional["DownloadStats"] = None
+_log_writer: Optional["DownloadLogWriter"] = None
+
+def _get_ffmpeg_slots() -> asyncio.Semaphore:
+    """Sémaphore limitant les processus ffmpeg (créé dans la boucle courante)"""
+    global _ffmpeg_slots
+    if _ffmpeg_slots is None:
+        _ffmpeg_slots = asyncio.Semaphore(FFMPEG_MAX_PROCESSES)
+    return _ffmpeg_slots
+
+def _get_download_stats() -> "DownloadStats":
+    """Compteurs de téléchargements (chargés au premier usage)"""
+    global _download_stats
+    if _download_stats is None:
+        _download_stats = DownloadStats(DOWNLOAD_LOG_DIR)
+    return _download_stats
+
+def _empty_counters() -> Dict:
+    return {'total': 0, 'success': 0, 'failed': 0, 'bytes': 0}
+
+class DownloadStats:
+    """
+    Compteurs globaux et quotidiens tenus à jour à chaque entrée de journal
+    (les compteurs par utilisateur sont dans la base SQLite, voir Storage)
+    
+    Un instantané (compteurs + position lue dans chaque journal) est
+    enregistré régulièrement : au démarrage, seule la fin des journaux
+    écrite depuis le dernier instantané est relue.
+    """
+    
+    def __init__(self, log_dir: str, snapshot_every: int = STATS_SNAPSHOT_EVERY):
+        self.log_dir = log_dir
+        self.snapshot_path = os.path.join(log_dir, STATS_SNAPSHOT_FILE)
+        self.snapshot_every = snapshot_every
+        
+        self.totals = _empty_counters()
+        self.days: Dict[str, Dict] = {}
+        # Nom du journal -> octets déjà comptabilisés
+        self.offsets: Dict[str, int] = {}
+        self._unsaved = 0
+        
+        self._load()
+    
+    def _load(self):
+        """Charger l'instantané puis rejouer la fin des journaux"""
+        try:
+            with open(self.snapshot_path, 'r', encoding='utf-8') as f:
+                snapshot = json.load(f)
+            self.totals = snapshot['totals']
+            self.days = snapshot['days']
+            self.offsets = snapshot['offsets']
+        except (OSError, ValueError, KeyError):
+            pass
+        
+        if self._replay():
+            self.save()
+    
+    def _replay(self) -> bool:
+        """Comptabiliser les entrées postérieures à l'instantané"""
+        if not os.path.isdir(self.log_dir):
+            return False
+        
+        replayed = False
+        present = set()
+        for name in sorted(os.listdir(self.log_dir)):
+            if not (name.startswith('downloads_') and name.endswith('.log')):
+                continue
+            present.add(name)
+            path = os.path.join(self.log_dir, name)
+            
+            offset = self.offsets.get(name, 0)
+            try:
+                size = os.path.getsize(path)
+                if size < offset:
+                    # Journal recréé depuis l'instantané
+                    offset = 0
+                if size == offset:
+                    continue
+                
+                with open(path, 'rb') as f:
+                    f.seek(offset)
+                    for line in f:
+                        if not line.endswith(b'\n'):
+                            break  # Ligne incomplète : relue la prochaine fois
+                        offset += len(line)
+                        try:
+                            self._apply(json.loads(line))
+                        except ValueError:
+                            continue
+            except OSError as e:
+                print(f"⚠️ Erreur lecture stats {name}: {e}")
+                continue
+            
+            self.offsets[name] = offset
+            replayed = True
+        
+        # Oublier les positions des journaux supprimés
+        self.offsets = {name: offset for name, offset in self.offsets.items() if name in present}
+        return replayed
+    
+    def _apply(self, entry: Dict):
+        """Ajouter une entrée aux compteurs globaux et du jour"""
+        success = bool(entry.get('success'))
+        size = entry.get('file_size') or 0
+        day = entry.get('timestamp', '').split('T')[0]
+        
+        if day not in self.days:
+            self.days[day] = _empty_counters()
+            # Dates ISO : l'ordre alphabétique est l'ordre chronologique
+            for old_day in sorted(self.days)[:-STATS_DAYS_KEPT]:
+                del self.days[old_day]
+        
+        for counters in (self.totals, self.days[day]):
+            counters['total'] += 1
+            counters['success' if success else 'failed'] += 1
+            # Seuls les octets réellement envoyés comptent
+            if success:
+                counters['bytes'] += size
+    
+    def record(self, entry: Dict, log_name: str, offset: int) -> bool:
+        """
+        Comptabiliser une entrée qui vient d'être écrite
+        
+        Args:
+            entry: Entrée du journal
+            log_name: Nom du journal du jour
+            offset: Position de fin de l'entrée dans le journal
+            
+        Returns:
+            bool: True s'il est temps d'enregistrer l'instantané
+        """
+        self._apply(entry)
+        self.offsets[log_name] = offset
+        self._unsaved += 1
+        return self._unsaved >= self.snapshot_every
+    
+    def snapshot(self) -> Dict:
+        """Copie des compteurs, à écrire ensuite hors de la boucle avec write()"""
+        self._unsaved = 0
+        return {
+            'totals': dict(self.totals),
+            'days': {day: dict(counters) for day, counters in self.days.items()},
+            'offsets': dict(self.offsets),
+        }
+    
+    def write(self, snapshot: Dict):
+        """Écrire un instantané (bloquant, remplacement atomique)"""
+        try:
+            os.makedirs(self.log_dir, exist_ok=True)
+            tmp_path = self.snapshot_path + '.tmp'
+            with open(tmp_path, 'w', encoding='utf-8') as f:
+                json.dump(snapshot, f)
+            os.replace(tmp_path, self.snapshot_path)
+        except OSError as e:
+            print(f"⚠️ Erreur écriture stats: {e}")
+    
+    def save(self):
+        """Enregistrer l'instantané (bloquant : démarrage ou écriture directe)"""
+        self.write(self.snapshot())
+    
+    def summary(self) -> Dict:
+        """Statistiques globales (format de get_download_stats)"""
+        today = self.days.get(datetime.now().strftime('%Y-%m-%d'), _empty_counters())
+        return {
+            'total_downloads': self.totals['total'],
+            'successful_downloads': self.totals['success'],
+            'failed_downloads': self.totals['failed'],
+            'total_size': self.totals['bytes'],
+            'today_downloads': today['total'],
+        }
+
+class DownloadLogWriter:
+    """
+    Écriture asynchrone des journaux de téléchargements
+    
+    log_download dépose les entrées dans une file ; une tâche de fond les
+    écrit par lots (dans un thread), garde le journal du jour ouvert,
+    change de fichier à minuit et fait un fsync périodique.
+    """
+    
+    def __init__(self, log_dir: str, download_stats: DownloadStats):
+        self.log_dir = log_dir
+        self.download_stats = download_stats
+        self.queue: asyncio.Queue = asyncio.Queue(maxsize=LOG_QUEUE_SIZE)
+        self._task: Optional[asyncio.Task] = None
+        
+        # Journal ouvert : (nom, fichier)
+        self._current: Optional[Tuple[str, object]] = None
+        self._last_fsync = time.monotonic()
+        
+        self.written = 0
+        self.batches = 0
+        self.dropped = 0
+    
+    def start(self):
+        """Démarrer la tâche d'écriture (dans la boucle courante)"""
+        if self._task is None:
+            self._task = asyncio.get_running_loop().create_task(self._run())
+    
+    def submit(self, entry: Dict):
+        """Déposer une entrée sans bloquer"""
+        try:
+            self.queue.put_nowait(entry)
+        except asyncio.QueueFull:
+            self.dropped += 1
+            if self.dropped % 1000 == 1:
+                print(f"⚠️ File des journaux pleine, entrées perdues: {self.dropped}")
+    
+    async def stop(self):
+        """Écrire les entrées en attente puis fermer le journal"""
+        if self._task is None:
+            return
+        await self.queue.put(None)
+        await self._task
+        self._task = None
+        await asyncio.to_thread(self._close)
+    
+    async def _run(self):
+        stopping = False
+        while not stopping:
+            batch = [await self.queue.get()]
+            while len(batch) < LOG_BATCH_SIZE:
+                try:
+                    batch.append(self.queue.get_nowait())
+                except asyncio.QueueEmpty:
+                    break
+            
+            if None in batch:
+                stopping = True
+                batch = [entry for entry in batch if entry is not None]
+            if not batch:
+                continue
+            
+            try:
+                written = await asyncio.to_thread(self._write_batch, batch)
+            except Exception as e:
+                print(f"⚠️ Erreur écriture log: {e}")
+                continue
+            
+            # Compteurs mis à jour dans la boucle, jamais depuis le thread
+            due = False
+            for entry, log_name, offset in written:
+                due = self.download_stats.record(entry, log_name, offset) or due
+            self.written += len(written)
+            self.batches += 1
+            
+            # Instantané copié dans la boucle, écrit dans un thread
+            if due:
+                await asyncio.to_thread(self.download_stats.write, self.download_stats.snapshot())
+    
+    def _write_batch(self, batch: List[Dict]) -> List[Tuple[Dict, str, int]]:
+        """Écrire un lot (thread) et retourner la position de fin de chaque entrée"""
+        written = []
+        for entry in batch:
+            log_name = f"downloads_{entry['timestamp'].split('T')[0]}.log"
+            f = self._open(log_name)
+            f.write((json.dumps(entry, ensure_ascii=False) + '\n').encode('utf-8'))
+            written.append((entry, log_name, f.tell()))
+        
+        self._current[1].flush()
+        if time.monotonic() - self._last_fsync >= LOG_FSYNC_INTERVAL:
+            os.fsync(self._current[1].fileno())
+            self._last_fsync = time.monotonic()
+        return written
+    
+    def _open(self, log_name: str):
+        """Journal du jour, ouvert une seule fois (rotation au changement de date)"""
+        if self._current and self._current[0] == log_name:
+            return self._current[1]
+        
+        self._close()
+        os.makedirs(self.log_dir, exist_ok=True)
+        f = open(os.path.join(self.log_dir, log_name), 'ab')
+        self._current = (log_name, f)
+        return f
+    
+    def _close(self):
+        if self._current:
+            f = self._current[1]
+            f.flush()
+            os.fsync(f.fileno())
+            f.close()
+            self._current = None
+    
+    def stats(self) -> Dict:
+        """Obtenir les statistiques de l'écrivain"""
+        return {
+            'queued': self.queue.qsize(),
+            'written': self.written,
+            'batches': self.batches,
+            'dropped': self.dropped,
+        }
 
 class Utils:
     @staticmethod
@@ -48,6 +409,14 @@ class Utils:
                     except Exception as e:
                         print(f"⚠️ Erreur nettoyage {filename}: {e}")
     
+    @staticmethod
+    def remove_file(path):
+        """Supprimer un fichier s'il existe encore (sans message)"""
+        try:
+            os.remove(path)
+        except OSError:
+            pass
+    
     @staticmethod
     def format_file_size(bytes_size: int) -> str:
         """
@@ -143,17 +512,33 @@ class Utils:
         Returns:
             bool: True si l'URL est valide
         """
-        import re
+        return URL_PATTERN.match(url) is not None
+    
+    @staticmethod
+    def is_pinterest_url(url: str) -> bool:
+        """
+        Vérifier si une URL est un lien Pinterest
         
-        url_pattern = re.compile(
-            r'^(https?://)?'  # http:// or https://
-            r'(?:(?:[A-Z0-9](?:[A-Z0-9-]{0,61}[A-Z0-9])?\.)+[A-Z]{2,6}\.?|'  # domaine
-            r'localhost|'  # localhost
-            r'\d{1,3}\.\d{1,3}\.\d{1,3}\.\d{1,3})'  # IP
-            r'(?::\d+)?'  # port
-            r'(?:/?|[/?]\S+)$', re.IGNORECASE)
+        Args:
+            url: URL à vérifier
+            
+        Returns:
+            bool: True si l'URL est un lien Pinterest reconnu
+        """
+        return pinterest_urls.is_pinterest_url(url)
+    
+    @staticmethod
+    def extract_pin_id(url: str) -> Optional[str]:
+        """
+        Extraire l'ID du pin d'une URL Pinterest
         
-        return url_pattern.match(url) is not None
+        Args:
+            url: URL Pinterest
+            
+        Returns:
+            Optional[str]: ID numérique du pin ou None
+        """
+        return pinterest_urls.extract_pin_id(url)
     
     @staticmethod
     def extract_urls_from_text(text: str) -> List[str]:
@@ -166,13 +551,7 @@ class Utils:
         Returns:
             List[str]: Liste des URLs trouvées
         """
-        import re
-        
-        url_pattern = re.compile(
-            r'https?://(?:[-\w.]|(?:%[\da-fA-F]{2}))+[/?=\w&%.#-]*'
-        )
-        
-        return url_pattern.findall(text)
+        return URL_IN_TEXT_PATTERN.findall(text)
     
     @staticmethod
     def log_download(user_id: int, username: str, url: str, 
@@ -189,14 +568,9 @@ class Utils:
             file_size: Taille du fichier en bytes
             duration: Durée de la vidéo en secondes
         """
-        log_dir = "temp/logs"
-        if not os.path.exists(log_dir):
-            os.makedirs(log_dir, exist_ok=True)
-        
-        log_file = os.path.join(log_dir, f"downloads_{datetime.now().strftime('%Y-%m-%d')}.log")
-        
+        now = datetime.now()
         log_entry = {
-            'timestamp': datetime.now().isoformat(),
+            'timestamp': now.isoformat(),
             'user_id': user_id,
             'username': username,
             'url': url[:100],  # Limiter la longueur de l'URL
@@ -207,9 +581,25 @@ class Utils:
             'duration_formatted': Utils.format_duration(duration)
         }
         
+        # Écrivain actif : l'écriture se fait par lots, hors de la boucle
+        if _log_writer is not None:
+            _log_writer.submit(log_entry)
+            return
+        
+        log_dir = DOWNLOAD_LOG_DIR
+        if not os.path.exists(log_dir):
+            os.makedirs(log_dir, exist_ok=True)
+        
+        log_name = f"downloads_{now.strftime('%Y-%m-%d')}.log"
+        log_file = os.path.join(log_dir, log_name)
+        
         try:
-            with open(log_file, 'a', encoding='utf-8') as f:
-                f.write(json.dumps(log_entry, ensure_ascii=False) + '\n')
+            stats = _get_download_stats()
+            with open(log_file, 'ab') as f:
+                f.write((json.dumps(log_entry, ensure_ascii=False) + '\n').encode('utf-8'))
+                offset = f.tell()
+            if stats.record(log_entry, log_name, offset):
+                stats.save()
         except Exception as e:
             print(f"⚠️ Erreur écriture log: {e}")
     
@@ -219,54 +609,279 @@ class Utils:
         Obtenir les statistiques de téléchargement
         
         Returns:
-            Dict: Statistiques
-        """
-        stats = {
-            'total_downloads': 0,
-            'successful_downloads': 0,
-            'failed_downloads': 0,
-            'total_size': 0,
-            'today_downloads': 0
-        }
+            Dict: Statistiques (compteurs tenus à jour, sans relire les journaux)
+        """
+        stats = _get_download_stats().summary()
+        stats['total_size_formatted'] = Utils.format_file_size(stats['total_size'])
+        return stats
+    
+    @staticmethod
+    def start_log_writer():
+        """Activer l'écriture des journaux par lots (au démarrage du bot)"""
+        global _log_writer
+        if _log_writer is None:
+            _log_writer = DownloadLogWriter(DOWNLOAD_LOG_DIR, _get_download_stats())
+            _log_writer.start()
+    
+    @staticmethod
+    async def stop_log_writer():
+        """Écrire les entrées en attente et revenir à l'écriture directe (à l'arrêt)"""
+        global _log_writer
+        if _log_writer is not None:
+            writer, _log_writer = _log_writer, None
+            await writer.stop()
+    
+    @staticmethod
+    def save_download_stats():
+        """Enregistrer l'instantané des compteurs (bloquant)"""
+        if _download_stats is not None:
+            _download_stats.save()
+    
+    @staticmethod
+    async def save_download_stats_async():
+        """Enregistrer l'instantané des compteurs sans bloquer la boucle (à l'arrêt du bot)"""
+        if _download_stats is not None:
+            await asyncio.to_thread(_download_stats.write, _download_stats.snapshot())
+    
+    @staticmethod
+    def _observe_command(operation: str, started: float, returncode: int):
+        """Mesurer la durée (et l'échec éventuel) d'un processus ffmpeg/ffprobe"""
+        metrics.FFMPEG_SECONDS.observe(time.perf_counter() - started, operation)
+        if returncode != 0:
+            metrics.ERRORS.inc('ffmpeg')
+    
+    @staticmethod
+    def run_command(cmd: List[str], operation: str = '') -> subprocess.CompletedProcess:
+        """
+        Exécuter ffmpeg/ffprobe (bloquant)
         
-        log_dir = "temp/logs"
-        if not os.path.exists(log_dir):
-            return stats
+        Args:
+            cmd: Commande et arguments
+            operation: Nom de l'opération pour les métriques (défaut : la commande)
+            
+        Returns:
+            subprocess.CompletedProcess: Résultat (sorties texte)
+        """
+        started = time.perf_counter()
+        result = subprocess.run(cmd, capture_output=True, text=True)
+        Utils._observe_command(operation or cmd[0], started, result.returncode)
+        return result
+    
+    @staticmethod
+    async def run_command_async(cmd: List[str], use_slot: bool = True,
+                                operation: str = '') -> Tuple[int, str, str]:
+        """
+        Exécuter ffmpeg/ffprobe sans bloquer la boucle asyncio
         
-        today = datetime.now().strftime('%Y-%m-%d')
+        Args:
+            cmd: Commande et arguments
+            use_slot: Réserver un des créneaux CPU (transcodages)
+            operation: Nom de l'opération pour les métriques (défaut : la commande)
+            
+        Returns:
+            Tuple[int, str, str]: (code retour, stdout, stderr)
+        """
+        slot = _get_ffmpeg_slots() if use_slot else contextlib.nullcontext()
         
-        try:
-            for log_file in os.listdir(log_dir):
-                if log_file.endswith('.log'):
-                    filepath = os.path.join(log_dir, log_file)
-                    
-                    with open(filepath, 'r', encoding='utf-8') as f:
-                        for line in f:
-                            try:
-                                entry = json.loads(line.strip())
-                                
-                                stats['total_downloads'] += 1
-                                
-                                if entry.get('success'):
-                                    stats['successful_downloads'] += 1
-                                else:
-                                    stats['failed_downloads'] += 1
-                                
-                                stats['total_size'] += entry.get('file_size', 0)
-                                
-                                # Compter les téléchargements d'aujourd'hui
-                                entry_date = entry.get('timestamp', '').split('T')[0]
-                                if entry_date == today:
-                                    stats['today_downloads'] += 1
-                                    
-                            except json.JSONDecodeError:
-                                continue
-        except Exception as e:
-            print(f"⚠️ Erreur lecture stats: {e}")
+        async with slot:
+            # Durée mesurée hors attente d'un créneau
+            started = time.perf_counter()
+            process = await asyncio.create_subprocess_exec(
+                *cmd,
+                stdout=asyncio.subprocess.PIPE,
+                stderr=asyncio.subprocess.PIPE
+            )
+            try:
+                stdout, stderr = await process.communicate()
+            except asyncio.CancelledError:
+                # Requête abandonnée : tuer le processus ffmpeg
+                if process.returncode is None:
+                    process.kill()
+                    await process.wait()
+                raise
         
-        stats['total_size_formatted'] = Utils.format_file_size(stats['total_size'])
+        Utils._observe_command(operation or cmd[0], started, process.returncode)
+        return (process.returncode,
+                stdout.decode('utf-8', errors='replace'),
+                stderr.decode('utf-8', errors='replace'))
+    
+    @staticmethod
+    def _remux_command(input_path: str, output_path: str) -> List[str]:
+        """Commande ffmpeg de remux (copie des flux, sans réencodage)"""
+        return [
+            'ffmpeg',
+            '-v', 'error',
+            '-i', input_path,
+            '-map', '0:v:0',
+            '-map', '0:a:0?',
+            '-map_metadata', '-1',
+            '-c', 'copy',
+            '-movflags', '+faststart',
+            '-y',
+            output_path
+        ]
+    
+    @staticmethod
+    def _downscale_command(input_path: str, output_path: str, height: int) -> List[str]:
+        """Commande ffmpeg de réduction au palier de qualité inférieur (CRF)"""
+        return [
+            'ffmpeg',
+            '-v', 'error',
+            '-i', input_path,
+            '-vf', f'scale=-2:{height}',
+            '-c:v', 'libx264',
+            '-preset', 'veryfast',
+            '-crf', '23',
+            '-threads', str(FFMPEG_THREADS),
+            '-c:a', 'aac',
+            '-b:a', f'{COMPRESS_AUDIO_BITRATE}',
+            '-movflags', '+faststart',
+            '-y',
+            output_path
+        ]
+    
+    @staticmethod
+    def _compress_command(input_path: str, output_path: str, target_bitrate: int,
+                          height: int = 0) -> List[str]:
+        """
+        Commande ffmpeg de réencodage à débit plafonné (VBV)
         
-        return stats
+        Avec maxrate = bufsize = débit cible, le flux vidéo ne peut pas
+        dépasser target_bitrate * (durée + 1 s) bits.
+        """
+        cmd = ['ffmpeg', '-v', 'error', '-i', input_path]
+        if height:
+            cmd += ['-vf', f'scale=-2:{height}']
+        return cmd + [
+            '-c:v', 'libx264',
+            '-b:v', f'{target_bitrate}',
+            '-maxrate', f'{target_bitrate}',
+            '-bufsize', f'{target_bitrate}',
+            '-preset', 'veryfast',
+            '-threads', str(FFMPEG_THREADS),
+            '-c:a', 'aac',
+            '-b:a', f'{COMPRESS_AUDIO_BITRATE}',
+            '-movflags', '+faststart',
+            '-y',  # Overwrite output
+            output_path
+        ]
+    
+    @staticmethod
+    def _compress_bitrate(max_size_bytes: int, duration: float) -> int:
+        """Débit vidéo maximum garantissant que le fichier tient dans max_size_bytes"""
+        budget_bits = max_size_bytes * 8 * CONTAINER_OVERHEAD
+        audio_bits = COMPRESS_AUDIO_BITRATE * duration
+        # Le tampon VBV (1 s de débit) peut s'ajouter à la durée
+        return int((budget_bits - audio_bits) / (duration + 1))
+    
+    @staticmethod
+    def _lower_rung(height: int) -> int:
+        """Palier de get_quality_name immédiatement inférieur (0 si aucun)"""
+        return next((rung for rung in QUALITY_LADDER if rung < height), 0)
+    
+    @staticmethod
+    def _fit_plan(input_path: str, output_path: str, info: Dict,
+                  file_size: int, max_size_bytes: int) -> List[Tuple[str, List[str]]]:
+        """
+        Échelle de tentatives, de la moins coûteuse à la plus sûre
+        
+        1. remux : copie des flux si la source dépasse de peu la cible
+        2. downscale : palier inférieur en CRF si l'estimation tient
+        3. vbv : réencodage à débit plafonné, qui tient par construction
+        
+        Returns:
+            List[Tuple[str, List[str]]]: (nom de la méthode, commande ffmpeg)
+        """
+        plan = []
+        
+        if file_size <= max_size_bytes * REMUX_TOLERANCE:
+            plan.append(('remux', Utils._remux_command(input_path, output_path)))
+        
+        height = info.get('height', 0)
+        rung = Utils._lower_rung(height) if height else 0
+        if rung and file_size * (rung / height) ** 2 <= max_size_bytes:
+            plan.append((f'downscale {rung}p', Utils._downscale_command(input_path, output_path, rung)))
+        
+        target_bitrate = Utils._compress_bitrate(max_size_bytes, info['duration'])
+        if target_bitrate > 0:
+            plan.append(('vbv', Utils._compress_command(input_path, output_path, target_bitrate, rung)))
+        
+        return plan
+    
+    @staticmethod
+    def _record_attempt(report: Dict, method: str, started: float, returncode: int,
+                        output_path: str, max_size_bytes: int) -> bool:
+        """Enregistrer une tentative (durée, taille obtenue) et indiquer si elle tient"""
+        elapsed = time.monotonic() - started
+        size = os.path.getsize(output_path) if returncode == 0 and os.path.exists(output_path) else 0
+        fits = 0 < size <= max_size_bytes
+        
+        report['attempts'].append({'method': method, 'seconds': round(elapsed, 2),
+                                   'size': size, 'fits': fits})
+        print(f"⏱️ {method}: {elapsed:.1f} s → "
+              f"{Utils.format_file_size(size) if size else 'échec'} {'✅' if fits else '❌'}")
+        
+        if fits:
+            report.update(success=True, method=method, size=size)
+        return fits
+    
+    @staticmethod
+    def fit_video(input_path: str, output_path: str, max_size_bytes: int) -> Dict:
+        """
+        Ramener une vidéo sous max_size_bytes avec l'échelle remux → downscale → vbv
+        
+        Appel bloquant, hors de la boucle asyncio (voir fit_video_async)
+        
+        Args:
+            input_path: Chemin de la vidéo source
+            output_path: Chemin de la vidéo produite
+            max_size_bytes: Taille maximum en octets
+            
+        Returns:
+            Dict: success, method, size et attempts (méthode, secondes, taille, tient)
+        """
+        return asyncio.run(Utils.fit_video_async(input_path, output_path, max_size_bytes))
+    
+    @staticmethod
+    async def fit_video_async(input_path: str, output_path: str, max_size_bytes: int) -> Dict:
+        """Version asynchrone de fit_video (annulable)"""
+        report = {'success': False, 'method': None, 'size': 0, 'attempts': []}
+        
+        try:
+            if not os.path.exists(input_path):
+                return report
+            
+            file_size = os.path.getsize(input_path)
+            if file_size <= max_size_bytes:
+                await asyncio.to_thread(shutil.copy2, input_path, output_path)
+                report.update(success=True, method='copy', size=file_size)
+                return report
+            
+            info = await Utils.probe_async(input_path)
+            if info.get('duration', 0) <= 0:
+                return report
+            
+            for method, cmd in Utils._fit_plan(input_path, output_path, info, file_size, max_size_bytes):
+                started = time.monotonic()
+                # Le remux ne sollicite pas le CPU : pas de créneau réservé
+                returncode, _, stderr = await Utils.run_command_async(
+                    cmd, use_slot=method != 'remux', operation=f"compress_{method.split()[0]}"
+                )
+                if Utils._record_attempt(report, method, started, returncode,
+                                         output_path, max_size_bytes):
+                    return report
+                if returncode != 0:
+                    print(f"❌ Erreur compression ({method}): {stderr}")
+            
+            Utils.cleanup_temp_files(output_path)
+            return report
+            
+        except asyncio.CancelledError:
+            Utils.cleanup_temp_files(output_path)
+            raise
+        except Exception as e:
+            print(f"⚠️ Exception compression: {e}")
+            return report
     
     @staticmethod
     def compress_video(input_path: str, output_path: str, 
@@ -282,52 +897,129 @@ class Utils:
         Returns:
             bool: True si la compression a réussi
         """
+        report = Utils.fit_video(input_path, output_path, max_size_mb * 1024 * 1024)
+        if report['success'] and report['method'] != 'copy':
+            print(f"✅ Vidéo compressée ({report['method']}): "
+                  f"{Utils.format_file_size(os.path.getsize(input_path))} → {Utils.format_file_size(report['size'])}")
+        return report['success']
+    
+    @staticmethod
+    async def compress_video_async(input_path: str, output_path: str,
+                                   max_size_mb: int = 50) -> bool:
+        """Version asynchrone de compress_video (annulable)"""
+        report = await Utils.fit_video_async(input_path, output_path, max_size_mb * 1024 * 1024)
+        if report['success'] and report['method'] != 'copy':
+            print(f"✅ Vidéo compressée ({report['method']}): "
+                  f"{Utils.format_file_size(os.path.getsize(input_path))} → {Utils.format_file_size(report['size'])}")
+        return report['success']
+    
+    @staticmethod
+    def _probe_command(file_path: str) -> List[str]:
+        """Commande ffprobe unique (format + flux, sortie JSON)"""
+        return [
+            'ffprobe',
+            '-v', 'error',
+            '-print_format', 'json',
+            '-show_format',
+            '-show_streams',
+            file_path
+        ]
+    
+    @staticmethod
+    def _probe_key(file_path: str) -> Tuple[str, int, int]:
+        """Clé de mémoïsation : (chemin, mtime, taille)"""
+        stat = os.stat(file_path)
+        return os.path.abspath(file_path), stat.st_mtime_ns, stat.st_size
+    
+    @staticmethod
+    def _parse_probe(output: str) -> Dict:
+        """Extraire les informations utiles de la sortie JSON de ffprobe"""
+        data = json.loads(output)
+        fmt = data.get('format', {})
+        streams = data.get('streams', [])
+        
+        video = next((s for s in streams if s.get('codec_type') == 'video'), {})
+        audio = next((s for s in streams if s.get('codec_type') == 'audio'), {})
+        
+        # Cadence "30000/1001" -> 29.97
+        fps = 0.0
+        num, _, den = (video.get('avg_frame_rate') or video.get('r_frame_rate') or '0/1').partition('/')
         try:
-            if not os.path.exists(input_path):
-                return False
+            fps = float(num) / float(den or 1) if float(den or 1) else 0.0
+        except ValueError:
+            pass
+        
+        return {
+            'duration': float(fmt.get('duration') or video.get('duration') or 0),
+            'size': int(fmt.get('size') or 0),
+            'bit_rate': int(fmt.get('bit_rate') or 0),
+            'format_name': fmt.get('format_name', ''),
+            'width': int(video.get('width') or 0),
+            'height': int(video.get('height') or 0),
+            'fps': round(fps, 2),
+            'video_codec': video.get('codec_name', ''),
+            'video_bit_rate': int(video.get('bit_rate') or 0),
+            'audio_codec': audio.get('codec_name', ''),
+            'audio_bit_rate': int(audio.get('bit_rate') or 0),
+            'has_audio': bool(audio),
+            'streams': streams,
+        }
+    
+    @staticmethod
+    def _remember_probe(key: Tuple[str, int, int], info: Dict):
+        _probe_cache[key] = info
+        while len(_probe_cache) > PROBE_CACHE_SIZE:
+            _probe_cache.popitem(last=False)
+    
+    @staticmethod
+    def probe(file_path: str) -> Dict:
+        """
+        Inspecter une vidéo avec un seul appel à ffprobe (mémoïsé)
+        
+        Args:
+            file_path: Chemin de la vidéo
             
-            # Vérifier la taille actuelle
-            file_size = os.path.getsize(input_path)
-            max_size_bytes = max_size_mb * 1024 * 1024
+        Returns:
+            Dict: Durée, taille, bitrate, codecs, résolution, fps et flux ({} si erreur)
+        """
+        try:
+            key = Utils._probe_key(file_path)
+            if key in _probe_cache:
+                _probe_cache.move_to_end(key)
+                return _probe_cache[key]
             
-            # Si la vidéo est déjà assez petite
-            if file_size <= max_size_bytes:
-                shutil.copy2(input_path, output_path)
-                return True
-            
-            # Calculer le bitrate cible
-            duration = Utils.get_video_duration(input_path)
-            if duration <= 0:
-                return False
-            
-            target_bitrate = int((max_size_bytes * 8) / duration) - 128000
-            
-            # Commande ffmpeg pour compression
-            cmd = [
-                'ffmpeg',
-                '-i', input_path,
-                '-c:v', 'libx264',
-                '-b:v', f'{target_bitrate}',
-                '-preset', 'fast',
-                '-c:a', 'aac',
-                '-b:a', '128k',
-                '-y',  # Overwrite output
-                output_path
-            ]
-            
-            # Exécuter la commande
-            result = subprocess.run(cmd, capture_output=True, text=True)
-            
-            if result.returncode == 0 and os.path.exists(output_path):
-                print(f"✅ Vidéo compressée: {Utils.format_file_size(file_size)} → {Utils.format_file_size(os.path.getsize(output_path))}")
-                return True
-            else:
-                print(f"❌ Erreur compression: {result.stderr}")
-                return False
-                
-        except Exception as e:
-            print(f"⚠️ Exception compression: {e}")
-            return False
+            result = Utils.run_command(Utils._probe_command(file_path), 'probe')
+            if result.returncode != 0:
+                return {}
+            
+            info = Utils._parse_probe(result.stdout)
+            Utils._remember_probe(key, info)
+            return info
+        except (OSError, ValueError) as e:
+            print(f"⚠️ Erreur ffprobe {file_path}: {e}")
+            return {}
+    
+    @staticmethod
+    async def probe_async(file_path: str) -> Dict:
+        """Version asynchrone de probe"""
+        try:
+            key = Utils._probe_key(file_path)
+            if key in _probe_cache:
+                _probe_cache.move_to_end(key)
+                return _probe_cache[key]
+            
+            returncode, stdout, _ = await Utils.run_command_async(
+                Utils._probe_command(file_path), use_slot=False, operation='probe'
+            )
+            if returncode != 0:
+                return {}
+            
+            info = Utils._parse_probe(stdout)
+            Utils._remember_probe(key, info)
+            return info
+        except (OSError, ValueError) as e:
+            print(f"⚠️ Erreur ffprobe {file_path}: {e}")
+            return {}
     
     @staticmethod
     def get_video_duration(file_path: str) -> float:
@@ -340,23 +1032,12 @@ class Utils:
         Returns:
             float: Durée en secondes, 0 si erreur
         """
-        try:
-            cmd = [
-                'ffprobe',
-                '-v', 'error',
-                '-show_entries', 'format=duration',
-                '-of', 'default=noprint_wrappers=1:nokey=1',
-                file_path
-            ]
-            
-            result = subprocess.run(cmd, capture_output=True, text=True)
-            
-            if result.returncode == 0:
-                return float(result.stdout.strip())
-            else:
-                return 0
-        except:
-            return 0
+        return Utils.probe(file_path).get('duration', 0)
+    
+    @staticmethod
+    async def get_video_duration_async(file_path: str) -> float:
+        """Version asynchrone de get_video_duration"""
+        return (await Utils.probe_async(file_path)).get('duration', 0)
     
     @staticmethod
     def get_video_resolution(file_path: str) -> Tuple[int, int]:
@@ -369,26 +1050,57 @@ class Utils:
         Returns:
             Tuple[int, int]: (largeur, hauteur)
         """
-        try:
-            cmd = [
-                'ffprobe',
-                '-v', 'error',
-                '-select_streams', 'v:0',
-                '-show_entries', 'stream=width,height',
-                '-of', 'csv=s=x:p=0',
-                file_path
-            ]
-            
-            result = subprocess.run(cmd, capture_output=True, text=True)
-            
-            if result.returncode == 0:
-                dimensions = result.stdout.strip().split('x')
-                if len(dimensions) == 2:
-                    return int(dimensions[0]), int(dimensions[1])
-        except:
-            pass
+        info = Utils.probe(file_path)
+        return info.get('width', 0), info.get('height', 0)
+    
+    @staticmethod
+    async def get_video_resolution_async(file_path: str) -> Tuple[int, int]:
+        """Version asynchrone de get_video_resolution"""
+        info = await Utils.probe_async(file_path)
+        return info.get('width', 0), info.get('height', 0)
+    
+    @staticmethod
+    def _segment_command(file_path: str, segment_time: float) -> List[str]:
+        """
+        Commande ffmpeg de découpage en une seule lecture (segment muxer)
         
-        return 0, 0
+        En copie de flux, chaque coupe est alignée sur l'image clé suivante.
+        """
+        return [
+            'ffmpeg',
+            '-v', 'error',
+            '-i', file_path,
+            '-map', '0',
+            '-c', 'copy',
+            '-f', 'segment',
+            '-segment_time', f'{segment_time:.3f}',
+            '-reset_timestamps', '1',
+            '-segment_format', 'mp4',
+            '-segment_format_options', 'movflags=+faststart',
+            '-segment_list', f"{file_path}_parts.txt",
+            '-segment_list_type', 'flat',
+            '-y',
+            f"{file_path}_part%03d.mp4"
+        ]
+    
+    @staticmethod
+    def _segment_time(info: Dict, file_size: int, max_part_size: int, margin: float) -> float:
+        """Durée de segment visée pour rester sous max_part_size"""
+        bytes_per_second = file_size / info['duration']
+        return max(1.0, (max_part_size * margin) / bytes_per_second)
+    
+    @staticmethod
+    def _read_segment_list(file_path: str) -> List[str]:
+        """Lire la liste des parties terminées écrite par ffmpeg"""
+        list_path = f"{file_path}_parts.txt"
+        directory = os.path.dirname(file_path)
+        try:
+            with open(list_path, 'r', encoding='utf-8') as f:
+                entries = [line.strip() for line in f if line.strip()]
+        except OSError:
+            return []
+        return [entry if os.path.isabs(entry) else os.path.join(directory, os.path.basename(entry))
+                for entry in entries]
     
     @staticmethod
     def split_video(file_path: str, max_part_size_mb: int = 45) -> List[str]:
@@ -413,46 +1125,149 @@ class Utils:
             if file_size <= max_part_size:
                 return [file_path]
             
-            duration = Utils.get_video_duration(file_path)
-            if duration <= 0:
+            info = Utils.probe(file_path)
+            if info.get('duration', 0) <= 0:
                 return []
             
-            # Calculer combien de parties sont nécessaires
-            num_parts = (file_size + max_part_size - 1) // max_part_size
-            part_duration = duration / num_parts
+            # Une seule lecture du fichier pour toutes les parties
+            segment_time = Utils._segment_time(info, file_size, max_part_size, SPLIT_SIZE_MARGIN)
+            result = Utils.run_command(Utils._segment_command(file_path, segment_time), 'split')
+            
+            output_files = Utils._read_segment_list(file_path)
+            Utils.cleanup_temp_files(f"{file_path}_parts.txt")
             
-            output_files = []
+            if result.returncode != 0 or not output_files:
+                for f in output_files:
+                    Utils.cleanup_temp_files(f)
+                print(f"❌ Erreur division vidéo: {result.stderr}")
+                return []
+            
+            for part in output_files:
+                if os.path.getsize(part) > max_part_size:
+                    print(f"⚠️ Partie trop grande: {os.path.basename(part)} "
+                          f"({Utils.format_file_size(os.path.getsize(part))})")
+            
+            return output_files
             
-            for i in range(num_parts):
-                output_file = f"{file_path}_part{i+1}.mp4"
-                start_time = i * part_duration
+        except Exception as e:
+            print(f"⚠️ Erreur division vidéo: {e}")
+            return []
+    
+    @staticmethod
+    async def split_video_stream(file_path: str, max_part_size_mb: int = 45,
+                                 margin: float = 0.0) -> AsyncIterator[str]:
+        """
+        Diviser une vidéo en une seule passe ffmpeg, partie par partie
+        
+        Chaque partie est fournie dès que ffmpeg l'a terminée, pour pouvoir
+        l'envoyer pendant que les suivantes sont encore en cours d'écriture.
+        
+        Args:
+            file_path: Chemin de la vidéo
+            max_part_size_mb: Taille maximum par partie
+            margin: Fraction de la taille maximum visée (défaut SPLIT_SIZE_MARGIN)
+            
+        Yields:
+            str: Chemin de chaque partie terminée
+        """
+        margin = margin or SPLIT_SIZE_MARGIN
+        file_size = os.path.getsize(file_path)
+        max_part_size = max_part_size_mb * 1024 * 1024
+        
+        if file_size <= max_part_size:
+            yield file_path
+            return
+        
+        info = await Utils.probe_async(file_path)
+        if info.get('duration', 0) <= 0:
+            raise RuntimeError("Durée de la vidéo inconnue")
+        
+        segment_time = Utils._segment_time(info, file_size, max_part_size, margin)
+        cmd = Utils._segment_command(file_path, segment_time)
+        
+        started = time.perf_counter()
+        process = await asyncio.create_subprocess_exec(
+            *cmd,
+            stdout=asyncio.subprocess.DEVNULL,
+            stderr=asyncio.subprocess.PIPE
+        )
+        stderr_task = asyncio.ensure_future(process.stderr.read())
+        done = 0
+        
+        try:
+            while True:
+                finished = process.returncode is not None
+                parts = Utils._read_segment_list(file_path)
                 
-                cmd = [
-                    'ffmpeg',
-                    '-i', file_path,
-                    '-ss', str(start_time),
-                    '-t', str(part_duration),
-                    '-c', 'copy',
-                    '-y',
-                    output_file
-                ]
+                for part in parts[done:]:
+                    done += 1
+                    
+                    if os.path.getsize(part) <= max_part_size:
+                        yield part
+                    elif margin > 0.5:
+                        # Image clé tardive : redécouper cette partie plus finement
+                        async for sub_part in Utils.split_video_stream(part, max_part_size_mb, margin * 0.8):
+                            yield sub_part
+                        Utils.cleanup_temp_files(part)
+                    else:
+                        print(f"⚠️ Partie trop grande: {os.path.basename(part)}")
+                        yield part
                 
-                result = subprocess.run(cmd, capture_output=True, text=True)
+                if finished:
+                    break
                 
-                if result.returncode == 0 and os.path.exists(output_file):
-                    output_files.append(output_file)
-                else:
-                    # Nettoyer les fichiers créés en cas d'erreur
-                    for f in output_files:
-                        Utils.cleanup_temp_files(f)
-                    return []
+                try:
+                    await asyncio.wait_for(process.wait(), SPLIT_POLL_INTERVAL)
+                except asyncio.TimeoutError:
+                    pass
             
+            stderr = (await stderr_task).decode('utf-8', errors='replace')
+            Utils._observe_command('split', started, process.returncode)
+            if process.returncode != 0:
+                raise RuntimeError(f"Erreur division vidéo: {stderr[:200]}")
+        finally:
+            # Abandon (annulation ou erreur) : tuer ffmpeg et nettoyer
+            if process.returncode is None:
+                process.kill()
+                await process.wait()
+            stderr_task.cancel()
+            listed = Utils._read_segment_list(file_path)[:done]
+            for part in glob.glob(f"{glob.escape(file_path)}_part[0-9][0-9][0-9].mp4"):
+                if part not in listed:
+                    Utils.cleanup_temp_files(part)
+            Utils.cleanup_temp_files(f"{file_path}_parts.txt")
+    
+    @staticmethod
+    async def split_video_async(file_path: str, max_part_size_mb: int = 45) -> List[str]:
+        """Version asynchrone de split_video (annulable)"""
+        output_files = []
+        try:
+            async for part in Utils.split_video_stream(file_path, max_part_size_mb):
+                output_files.append(part)
             return output_files
-            
+        except asyncio.CancelledError:
+            for f in output_files:
+                Utils.cleanup_temp_files(f)
+            raise
         except Exception as e:
+            for f in output_files:
+                Utils.cleanup_temp_files(f)
             print(f"⚠️ Erreur division vidéo: {e}")
             return []
     
+    @staticmethod
+    def _thumbnail_command(video_path: str, thumbnail_path: str, time_sec: int) -> List[str]:
+        """Commande ffmpeg de capture d'une miniature"""
+        return [
+            'ffmpeg',
+            '-i', video_path,
+            '-ss', str(time_sec),
+            '-vframes', '1',
+            '-vf', 'scale=320:-1',
+            '-y',
+            thumbnail_path
+        ]
+    
     @staticmethod
     def generate_thumbnail(video_path: str, thumbnail_path: str, time_sec: int = 10) -> bool:
         """
@@ -467,23 +1282,26 @@ class Utils:
             bool: True si réussi
         """
         try:
-            cmd = [
-                'ffmpeg',
-                '-i', video_path,
-                '-ss', str(time_sec),
-                '-vframes', '1',
-                '-vf', 'scale=320:-1',
-                '-y',
-                thumbnail_path
-            ]
-            
-            result = subprocess.run(cmd, capture_output=True, text=True)
+            cmd = Utils._thumbnail_command(video_path, thumbnail_path, time_sec)
+            result = Utils.run_command(cmd, 'thumbnail')
             return result.returncode == 0 and os.path.exists(thumbnail_path)
             
         except Exception as e:
             print(f"⚠️ Erreur génération miniature: {e}")
             return False
     
+    @staticmethod
+    async def generate_thumbnail_async(video_path: str, thumbnail_path: str, time_sec: int = 10) -> bool:
+        """Version asynchrone de generate_thumbnail"""
+        try:
+            cmd = Utils._thumbnail_command(video_path, thumbnail_path, time_sec)
+            returncode, _, _ = await Utils.run_command_async(cmd, operation='thumbnail')
+            return returncode == 0 and os.path.exists(thumbnail_path)
+            
+        except OSError as e:
+            print(f"⚠️ Erreur génération miniature: {e}")
+            return False
+    
     @staticmethod
     def get_file_hash(file_path: str) -> str:
         """
@@ -498,7 +1316,7 @@ class Utils:
         try:
             hash_md5 = hashlib.md5()
             with open(file_path, "rb") as f:
-                for chunk in iter(lambda: f.read(4096), b""):
+                for chunk in iter(lambda: f.read(1024 * 1024), b""):
                     hash_md5.update(chunk)
             return hash_md5.hexdigest()
         except:
@@ -535,6 +1353,14 @@ def is_valid_url(url: str) -> bool:
     """Vérifier si une URL est valide"""
     return Utils.is_valid_url(url)
 
+def is_pinterest_url(url: str) -> bool:
+    """Vérifier si une URL est un lien Pinterest"""
+    return Utils.is_pinterest_url(url)
+
+def probe(file_path: str) -> Dict:
+    """Inspecter une vidéo (ffprobe unique, mémoïsé)"""
+    return Utils.probe(file_path)
+
 # Test rapide
 if __name__ == "__main__":
     print("🧪 Test des utilitaires...")
@@ -549,5 +1375,6 @@ if __name__ == "__main__":
     
     # Test URL
     print(f"URL valide: {is_valid_url('https://pinterest.com/pin/123')}")
+    print(f"URL Pinterest: {is_pinterest_url('https://pin.it/abc123')}")
     
     print("✅ Tests terminés")